@@ -0,0 +1,66 @@
+import random
+import time
+
+from lfa import Grammar
+
+
+def random_strings(count, alphabet='abc', max_length=15, seed=0):
+    rng = random.Random(seed)
+    return [''.join(rng.choice(alphabet) for _ in range(rng.randint(1, max_length)))
+            for _ in range(count)]
+
+
+def language_strings(count, max_run=20, seed=0):
+    rng = random.Random(seed)
+
+    def run():
+        return ''.join(rng.choice('ab') for _ in range(rng.randint(0, max_run)))
+
+    return [f"{run()}ca{run()}c" for _ in range(count)]
+
+
+def bench_check_string(count=200_000):
+    fa = Grammar().to_finite_automaton()
+    compiled = fa.compile()
+    strings = random_strings(count // 2) + language_strings(count // 2)
+
+    start = time.perf_counter()
+    expected = [fa.check_string(s) for s in strings]
+    dict_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = [compiled.check_string(s) for s in strings]
+    compiled_time = time.perf_counter() - start
+
+    assert expected == actual
+    print(f"check_string over {count} strings:")
+    print(f"  dict      {dict_time:7.3f}s  {count / dict_time:12,.0f} strings/s")
+    print(f"  compiled  {compiled_time:7.3f}s  {count / compiled_time:12,.0f} strings/s")
+
+
+def bench_check_many(count=1_000_000):
+    fa = Grammar().to_finite_automaton()
+    compiled = fa.compile()
+    strings = random_strings(count // 2) + language_strings(count // 2)
+
+    start = time.perf_counter()
+    expected = [compiled.check_string(s) for s in strings]
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = compiled.check_many(strings)
+    batch_time = time.perf_counter() - start
+
+    assert expected == actual.tolist()
+    print(f"check_many over {count} strings:")
+    print(f"  check_string loop  {loop_time:7.3f}s  {count / loop_time:12,.0f} strings/s")
+    print(f"  check_many         {batch_time:7.3f}s  {count / batch_time:12,.0f} strings/s")
+
+
+def main():
+    bench_check_string()
+    bench_check_many()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
+import mmap
+import os
 import random
+from bisect import bisect_left, bisect_right
 
 class Grammar:
     def __init__(self):
@@ -11,19 +14,130 @@ class Grammar:
         }
         self.start_symbol = 'S'
 
-    def generate_strings(self, n=5):
-        def derive(symbol):
+    def generate_strings(self, n=5, max_length=15, seed=None):
+        # n distinct strings drawn uniformly from every string of length at
+        # most max_length: distinct ranks over the combined count_table totals
+        # are unranked, so there is no rejection loop over derivations.
+        counts = self.count_table(max_length)
+        totals = [counts[length][self.start_symbol] for length in range(max_length + 1)]
+        total = sum(totals)
+        if n > total:
+            raise ValueError(f"the grammar derives only {total} strings of length at most {max_length}")
+
+        rng = random.Random(seed)
+        if 2 * n >= total:
+            ranks = rng.sample(range(total), n)
+        else:
+            chosen = set()
+            ranks = []
+            while len(ranks) < n:
+                rank = rng.randrange(total)
+                if rank not in chosen:
+                    chosen.add(rank)
+                    ranks.append(rank)
+
+        strings = []
+        for rank in ranks:
+            length = 0
+            while rank >= totals[length]:
+                rank -= totals[length]
+                length += 1
+            strings.append(self.unrank_string(rank, length, counts))
+        return strings
+
+    def min_lengths(self):
+        lengths = {symbol: 1 for symbol in self.VT}
+        lengths.update({nt: float('inf') for nt in self.VN})
+
+        changed = True
+        while changed:
+            changed = False
+            for nt, prods in self.P.items():
+                for prod in prods:
+                    length = sum(lengths[s] for s in prod)
+                    if length < lengths[nt]:
+                        lengths[nt] = length
+                        changed = True
+        return lengths
+
+    def derive_string(self, max_length=None, max_depth=None, rng=random, min_lengths=None):
+        # Leftmost derivation driven by an explicit stack of (symbol, depth).
+        # `pending` is the shortest output the stack can still produce, so a
+        # derivation is abandoned as soon as it can no longer fit max_length.
+        if min_lengths is None:
+            min_lengths = self.min_lengths()
+
+        buffer = []
+        stack = [(self.start_symbol, 0)]
+        pending = min_lengths[self.start_symbol]
+
+        while stack:
+            symbol, depth = stack.pop()
+            pending -= min_lengths[symbol]
+
             if symbol in self.VT:
-                return symbol
-            production = random.choice(self.P[symbol])
-            return ''.join(derive(s) for s in production)
+                buffer.append(symbol)
+                continue
+
+            if max_depth is not None and depth >= max_depth:
+                return None
+
+            production = rng.choice(self.P[symbol])
+            for s in reversed(production):
+                stack.append((s, depth + 1))
+                pending += min_lengths[s]
+
+            if max_length is not None and len(buffer) + pending > max_length:
+                return None
+
+        return ''.join(buffer)
+
+    def enumerate_strings(self, max_length=None, after=None):
+        return self.to_finite_automaton().iter_language(max_length, after)
+
+    def count_table(self, length):
+        # counts[k][nt] is the number of strings of length k derivable from nt.
+        # Productions are right-linear, as in to_finite_automaton: a terminal
+        # optionally followed by a nonterminal.
+        counts = [{nt: 0 for nt in self.VN}]
+        for k in range(1, length + 1):
+            counts.append({
+                nt: sum(self.production_count(prod, k, counts) for prod in self.P.get(nt, []))
+                for nt in self.VN
+            })
+        return counts
+
+    def production_count(self, production, length, counts):
+        if len(production) == 1:
+            return 1 if length == 1 else 0
+        return counts[length - 1][production[1]]
+
+    def count_strings(self, length):
+        return self.count_table(length)[length][self.start_symbol]
+
+    def unrank_string(self, rank, length, counts):
+        symbol = self.start_symbol
+        result = []
+        for remaining in range(length, 0, -1):
+            for production in self.P[symbol]:
+                count = self.production_count(production, remaining, counts)
+                if rank < count:
+                    break
+                rank -= count
+            result.append(production[0])
+            if len(production) > 1:
+                symbol = production[1]
+        return ''.join(result)
+
+    def generate_uniform(self, length, n=1, seed=None):
+        counts = self.count_table(length)
+        total = counts[length][self.start_symbol]
+        if total == 0:
+            raise ValueError(f"the grammar derives no strings of length {length}")
 
-        valid_strings = set()
-        while len(valid_strings) < n:
-            result = derive(self.start_symbol)
-            if len(result) <= 15:
-                valid_strings.add(result)
-        return list(valid_strings)
+        rng = random.Random(seed)
+        for _ in range(n):
+            yield self.unrank_string(rng.randrange(total), length, counts)
 
     def to_finite_automaton(self):
         states = {'q0', 'qf'} | {f'q_{nt}' for nt in self.VN}
@@ -59,6 +173,292 @@ class FiniteAutomaton:
             current = self.transitions[current][symbol]
         return current in self.accept_states
 
+    def iter_language(self, max_length=None, after=None):
+        symbols = sorted(self.alphabet)
+
+        reachable = {self.start_state}
+        stack = [self.start_state]
+        while stack:
+            for next_state in self.transitions.get(stack.pop(), {}).values():
+                if next_state not in reachable:
+                    reachable.add(next_state)
+                    stack.append(next_state)
+
+        # finishing[k] holds the reachable states that reach an accepting
+        # state in exactly k steps. Each level depends only on the previous
+        # one, so once a level is empty every later one is too; a level stays
+        # non-empty forever only if a reachable cycle leads to acceptance,
+        # i.e. the language is infinite.
+        finishing = [set(self.accept_states) & reachable]
+        length = 0 if after is None else len(after)
+
+        while max_length is None or length <= max_length:
+            while len(finishing) <= length:
+                previous = finishing[-1]
+                finishing.append({state for state in reachable
+                                  if any(next_state in previous
+                                         for next_state in self.transitions.get(state, {}).values())})
+            if not finishing[length]:
+                return
+
+            cursor = after if after is not None and len(after) == length else None
+            yield from self.iter_length(length, symbols, finishing, cursor)
+            length += 1
+
+    def iter_length(self, length, symbols, finishing, after=None):
+        if self.start_state not in finishing[length]:
+            return
+        if length == 0:
+            if after is None:
+                yield ''
+            return
+
+        def first_symbol(depth, tight):
+            if not tight:
+                return 0
+            if depth == length - 1:
+                return bisect_right(symbols, after[depth])
+            return bisect_left(symbols, after[depth])
+
+        prefix = []
+        stack = [(self.start_state, first_symbol(0, after is not None), after is not None)]
+
+        while stack:
+            depth = len(stack) - 1
+            state, i, tight = stack[-1]
+            moves = self.transitions.get(state, {})
+            targets = finishing[length - depth - 1]
+
+            while i < len(symbols) and moves.get(symbols[i]) not in targets:
+                i += 1
+            if i == len(symbols):
+                stack.pop()
+                if prefix:
+                    prefix.pop()
+                continue
+
+            stack[-1] = (state, i + 1, tight)
+            symbol = symbols[i]
+            if depth == length - 1:
+                yield ''.join(prefix) + symbol
+                continue
+
+            tight = tight and symbol == after[depth]
+            prefix.append(symbol)
+            stack.append((moves[symbol], first_symbol(depth + 1, tight), tight))
+
+    def compile(self):
+        states = set(self.states) | set(self.transitions) | {self.start_state}
+        for moves in self.transitions.values():
+            states.update(moves.values())
+        states = sorted(states)
+        symbols = sorted(self.alphabet)
+        state_codes = {state: i for i, state in enumerate(states)}
+        symbol_codes = {symbol: i for i, symbol in enumerate(symbols)}
+
+        # One row per state plus a trailing dead row; one column per symbol
+        # plus a trailing column for characters outside the alphabet. Entries
+        # hold row offsets rather than state numbers, so matching costs one
+        # addition and one index per character.
+        width = len(symbols) + 1
+        dead = len(states) * width
+        table = [dead] * (dead + width)
+        for state, moves in self.transitions.items():
+            row = state_codes[state] * width
+            for symbol, next_state in moves.items():
+                if symbol in symbol_codes:
+                    table[row + symbol_codes[symbol]] = state_codes[next_state] * width
+
+        accepting = [False] * (dead + width)
+        for state in self.accept_states:
+            if state in state_codes:
+                accepting[state_codes[state] * width] = True
+
+        return CompiledAutomaton(table, symbol_codes, accepting,
+                                 state_codes[self.start_state] * width, dead, width - 1)
+
+    def check_many(self, strings):
+        return self.compile().check_many(strings)
+
+    def stream(self):
+        return self.compile().stream()
+
+
+class CompiledAutomaton:
+    def __init__(self, table, symbol_codes, accepting, start, dead, unknown_symbol):
+        self.table = table
+        self.symbol_codes = symbol_codes
+        self.accepting = accepting
+        self.start = start
+        self.dead = dead
+        self.unknown_symbol = unknown_symbol
+        self.batch_tables = None
+
+    def check_string(self, input_string):
+        table = self.table
+        code = self.symbol_codes.get
+        unknown = self.unknown_symbol
+        dead = self.dead
+
+        current = self.start
+        for symbol in input_string:
+            current = table[current + code(symbol, unknown)]
+            if current == dead:
+                return False
+        return self.accepting[current]
+
+    def stream(self):
+        return StreamMatcher(self)
+
+    def check_many(self, strings, chunk_size=16384, max_cells=1 << 20):
+        import numpy as np
+
+        table, accepting = self.get_batch_tables()
+        width = self.unknown_symbol + 1
+        padding = width
+        results = np.empty(len(strings), dtype=bool)
+
+        # A chunk holds at most chunk_size rows and max_cells padded cells
+        # (rows x longest string so far), so one long outlier among short
+        # strings ends the chunk before it instead of padding every row.
+        all_lengths = np.fromiter(map(len, strings), dtype=np.intp, count=len(strings))
+
+        offset = 0
+        while offset < len(strings):
+            end = min(offset + chunk_size, len(strings))
+            widths = np.maximum.accumulate(all_lengths[offset:end])
+            cells = np.arange(1, end - offset + 1) * widths
+            end = offset + max(int(np.searchsorted(cells, max_cells, side='right')), 1)
+
+            chunk = strings[offset:end]
+            lengths = all_lengths[offset:end]
+            rows = slice(offset, end)
+            offset = end
+            if len(chunk) < 32:
+                # Stepping a handful of rows costs a NumPy call per column;
+                # the scalar loop is faster for a few long strings.
+                results[rows] = [self.check_string(s) for s in chunk]
+                continue
+
+            longest = int(lengths.max())
+
+            # Fixed-width UCS4 array -> one row of code points per string,
+            # translated to symbol columns through a lookup table. NumPy drops
+            # trailing NULs, so rows are re-padded to the true maximum length.
+            points = np.zeros((len(chunk), longest), dtype=np.uint32)
+            if longest:
+                chars = np.array(chunk, dtype=str)
+                if chars.itemsize:
+                    stored = chars.view(np.uint32).reshape(len(chunk), -1)
+                    points[:, :stored.shape[1]] = stored
+
+            lookup = np.full(int(points.max(initial=0)) + 1, self.unknown_symbol, dtype=np.intp)
+            for symbol, code in self.symbol_codes.items():
+                if len(symbol) == 1 and ord(symbol) < len(lookup):
+                    lookup[ord(symbol)] = code
+            codes = lookup[points]
+            codes[np.arange(longest) >= lengths[:, None]] = padding
+
+            current = np.full(len(chunk), self.start // width * (width + 1), dtype=np.intp)
+            for column in np.ascontiguousarray(codes.T):
+                current = table[current + column]
+            results[rows] = accepting[current]
+
+        return results
+
+    def get_batch_tables(self):
+        import numpy as np
+
+        # Same layout as self.table with one extra column per row that maps
+        # the state onto itself, used to idle rows past the end of their string.
+        if self.batch_tables is None:
+            width = self.unknown_symbol + 1
+            rows = len(self.table) // width
+            old = np.array(self.table, dtype=np.intp).reshape(rows, width)
+            table = np.empty((rows, width + 1), dtype=np.intp)
+            table[:, :width] = old // width * (width + 1)
+            table[:, width] = np.arange(rows) * (width + 1)
+
+            accepting = np.zeros(rows * (width + 1), dtype=bool)
+            accepting[::width + 1] = self.accepting[::width]
+            self.batch_tables = (table.ravel(), accepting)
+        return self.batch_tables
+
+class StreamMatcher:
+    def __init__(self, compiled):
+        self.compiled = compiled
+
+        # Byte input is read as Latin-1: byte b is the symbol chr(b).
+        self.byte_codes = [compiled.unknown_symbol] * 256
+        for symbol, code in compiled.symbol_codes.items():
+            if len(symbol) == 1 and ord(symbol) < 256:
+                self.byte_codes[ord(symbol)] = code
+
+        self.current = compiled.start
+        self.offset = 0
+
+    def reset(self):
+        self.current = self.compiled.start
+        self.offset = 0
+
+    def is_accepting(self):
+        return self.compiled.accepting[self.current]
+
+    def feed(self, chunk):
+        for _ in self.scan(chunk):
+            pass
+        return self.is_accepting()
+
+    def scan(self, chunk):
+        table = self.compiled.table
+        accepting = self.compiled.accepting
+        dead = self.compiled.dead
+
+        current = self.current
+        position = self.offset
+        end = position + len(chunk)
+        if current == dead:
+            self.offset = end
+            return
+
+        if isinstance(chunk, str):
+            code = self.compiled.symbol_codes.get
+            unknown = self.compiled.unknown_symbol
+            symbols = (code(symbol, unknown) for symbol in chunk)
+        else:
+            symbols = map(self.byte_codes.__getitem__, memoryview(chunk))
+
+        # State and offset are saved together at the last consumed symbol, so
+        # a caller that stops iterating early can carry on from there. The
+        # dead state absorbs the rest of the chunk.
+        try:
+            for position, symbol in enumerate(symbols, position + 1):
+                current = table[current + symbol]
+                if current == dead:
+                    position = end
+                    break
+                if accepting[current]:
+                    yield position
+        finally:
+            self.current = current
+            self.offset = position
+
+    def scan_file(self, path, block_size=1 << 20):
+        self.reset()
+        if self.is_accepting():
+            yield 0
+
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                for start in range(0, len(view), block_size):
+                    with view[start:start + block_size] as block:
+                        yield from self.scan(block)
+                    if self.current == self.compiled.dead:
+                        return
+
+
 def main():
     grammar = Grammar()
 
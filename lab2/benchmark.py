@@ -0,0 +1,66 @@
+import time
+
+from lab2 import FiniteAutomaton, StateLimitExceeded
+
+
+def nth_from_end_nfa(n):
+    states = [f"s{i}" for i in range(n + 1)]
+    transitions = {
+        ('s0', 'a'): ['s0', 's1'],
+        ('s0', 'b'): 's0',
+    }
+    for i in range(1, n):
+        transitions[(f"s{i}", 'a')] = f"s{i + 1}"
+        transitions[(f"s{i}", 'b')] = f"s{i + 1}"
+
+    return FiniteAutomaton(states, ['a', 'b'], transitions, 's0', [f"s{n}"])
+
+
+def bench_subset_construction():
+    print("Subset construction, 'n-th symbol from the end is a':")
+    for n in range(8, 18):
+        nfa = nth_from_end_nfa(n)
+        start = time.perf_counter()
+        dfa = nfa.to_dfa()
+        elapsed = time.perf_counter() - start
+        print(f"  n={n:2d}  dfa states={len(dfa.states):7d}  {elapsed:8.3f}s")
+
+    nfa = nth_from_end_nfa(30)
+    start = time.perf_counter()
+    try:
+        nfa.to_dfa(max_states=10 ** 5)
+    except StateLimitExceeded as e:
+        print(f"  n=30  aborted: {e} after {time.perf_counter() - start:.3f}s")
+
+
+def redundant_dfa(n, modulus=10):
+    states = [f"s{i}" for i in range(n)]
+    transitions = {}
+    for i in range(n):
+        transitions[(f"s{i}", 'a')] = f"s{(i + 1) % n}"
+        transitions[(f"s{i}", 'b')] = f"s{(2 * i) % n}"
+    final_states = [f"s{i}" for i in range(0, n, modulus)]
+
+    return FiniteAutomaton(states, ['a', 'b'], transitions, 's0', final_states)
+
+
+def bench_minimization():
+    print("Minimization, 'i mod 10 == 0' unrolled over n states:")
+    for n in (10 ** 4, 10 ** 5, 10 ** 6):
+        dfa = redundant_dfa(n)
+        for algorithm in ('hopcroft', 'moore'):
+            if algorithm == 'moore' and n > 10 ** 5:
+                continue
+            start = time.perf_counter()
+            minimal = dfa.minimize(algorithm)
+            elapsed = time.perf_counter() - start
+            print(f"  n={n:7d}  {algorithm:8s}  {len(dfa.states):7d} -> {len(minimal.states):3d} states  {elapsed:8.3f}s")
+
+
+def main():
+    bench_subset_construction()
+    bench_minimization()
+
+
+if __name__ == "__main__":
+    main()
@@ -55,19 +55,80 @@ class Grammar:
 
         return ChomskyType.TYPE0
 
-    def generate_strings(self, n=5):
-        def derive(symbol):
-            if symbol in self.VT:
-                return symbol
-            production = random.choice(self.P[symbol])
-            return ''.join(derive(s) for s in production)
-
-        valid_strings = set()
-        while len(valid_strings) < n:
-            result = derive(self.start_symbol)
-            if len(result) <= 15:
-                valid_strings.add(result)
-        return list(valid_strings)
+    def generate_strings(self, n=5, max_length=15, seed=None):
+        # n distinct strings drawn uniformly from every string of length at
+        # most max_length: distinct ranks over the combined count_table totals
+        # are unranked, so there is no rejection loop over derivations.
+        counts = self.count_table(max_length)
+        totals = [counts[length][self.start_symbol] for length in range(max_length + 1)]
+        total = sum(totals)
+        if n > total:
+            raise ValueError(f"the grammar derives only {total} strings of length at most {max_length}")
+
+        rng = random.Random(seed)
+        if 2 * n >= total:
+            ranks = rng.sample(range(total), n)
+        else:
+            chosen = set()
+            ranks = []
+            while len(ranks) < n:
+                rank = rng.randrange(total)
+                if rank not in chosen:
+                    chosen.add(rank)
+                    ranks.append(rank)
+
+        strings = []
+        for rank in ranks:
+            length = 0
+            while rank >= totals[length]:
+                rank -= totals[length]
+                length += 1
+            strings.append(self.unrank_string(rank, length, counts))
+        return strings
+
+    def count_table(self, length):
+        # counts[k][nt] is the number of strings of length k derivable from nt.
+        # Productions are right-linear, as in to_finite_automaton: a terminal
+        # optionally followed by a nonterminal.
+        counts = [{nt: 0 for nt in self.VN}]
+        for k in range(1, length + 1):
+            counts.append({
+                nt: sum(self.production_count(prod, k, counts) for prod in self.P.get(nt, []))
+                for nt in self.VN
+            })
+        return counts
+
+    def production_count(self, production, length, counts):
+        if len(production) == 1:
+            return 1 if length == 1 else 0
+        return counts[length - 1][production[1]]
+
+    def count_strings(self, length):
+        return self.count_table(length)[length][self.start_symbol]
+
+    def unrank_string(self, rank, length, counts):
+        symbol = self.start_symbol
+        result = []
+        for remaining in range(length, 0, -1):
+            for production in self.P[symbol]:
+                count = self.production_count(production, remaining, counts)
+                if rank < count:
+                    break
+                rank -= count
+            result.append(production[0])
+            if len(production) > 1:
+                symbol = production[1]
+        return ''.join(result)
+
+    def generate_uniform(self, length, n=1, seed=None):
+        counts = self.count_table(length)
+        total = counts[length][self.start_symbol]
+        if total == 0:
+            raise ValueError(f"the grammar derives no strings of length {length}")
+
+        rng = random.Random(seed)
+        for _ in range(n):
+            yield self.unrank_string(rng.randrange(total), length, counts)
 
     def to_finite_automaton(self):
         states = {'q0', 'qf'} | {f'q_{nt}' for nt in self.VN}
@@ -104,6 +165,59 @@ class FiniteAutomaton:
             current = self.transitions[current][symbol]
         return current in self.accept_states
 
+    def compile(self):
+        states = set(self.states) | set(self.transitions) | {self.start_state}
+        for moves in self.transitions.values():
+            states.update(moves.values())
+        states = sorted(states)
+        symbols = sorted(self.alphabet)
+        state_codes = {state: i for i, state in enumerate(states)}
+        symbol_codes = {symbol: i for i, symbol in enumerate(symbols)}
+
+        # One row per state plus a trailing dead row; one column per symbol
+        # plus a trailing column for characters outside the alphabet. Entries
+        # hold row offsets rather than state numbers, so matching costs one
+        # addition and one index per character.
+        width = len(symbols) + 1
+        dead = len(states) * width
+        table = [dead] * (dead + width)
+        for state, moves in self.transitions.items():
+            row = state_codes[state] * width
+            for symbol, next_state in moves.items():
+                if symbol in symbol_codes:
+                    table[row + symbol_codes[symbol]] = state_codes[next_state] * width
+
+        accepting = [False] * (dead + width)
+        for state in self.accept_states:
+            if state in state_codes:
+                accepting[state_codes[state] * width] = True
+
+        return CompiledAutomaton(table, symbol_codes, accepting,
+                                 state_codes[self.start_state] * width, dead, width - 1)
+
+
+class CompiledAutomaton:
+    def __init__(self, table, symbol_codes, accepting, start, dead, unknown_symbol):
+        self.table = table
+        self.symbol_codes = symbol_codes
+        self.accepting = accepting
+        self.start = start
+        self.dead = dead
+        self.unknown_symbol = unknown_symbol
+
+    def check_string(self, input_string):
+        table = self.table
+        code = self.symbol_codes.get
+        unknown = self.unknown_symbol
+        dead = self.dead
+
+        current = self.start
+        for symbol in input_string:
+            current = table[current + code(symbol, unknown)]
+            if current == dead:
+                return False
+        return self.accepting[current]
+
 
 def main():
     grammar = Grammar()
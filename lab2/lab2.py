@@ -1,5 +1,16 @@
+from collections import deque
+
 import graphviz
 
+EPSILON = 'ε'
+
+
+class StateLimitExceeded(Exception):
+    def __init__(self, max_states):
+        super().__init__(f"subset construction exceeded {max_states} DFA states")
+        self.max_states = max_states
+
+
 class FiniteAutomaton:
     def __init__(self, states, alphabet, transitions, start_state, final_states):
         self.states = states
@@ -7,25 +18,44 @@ class FiniteAutomaton:
         self.transitions = transitions
         self.start_state = start_state
         self.final_states = final_states
+        self.index = {}
+        self.closure_cache = None
+        self.build_index()
+
+    def build_index(self):
+        self.index = {}
+        self.closure_cache = None
+        for (state, symbol), destinations in self.transitions.items():
+            dest_list = destinations if isinstance(destinations, list) else [destinations]
+            self.index.setdefault(state, {}).setdefault(symbol, []).extend(dest_list)
+
+    def add_transition(self, state, symbol, destination):
+        existing = self.transitions.get((state, symbol))
+        if existing is None:
+            self.transitions[(state, symbol)] = destination
+        elif isinstance(existing, list):
+            existing.append(destination)
+        else:
+            self.transitions[(state, symbol)] = [existing, destination]
+
+        self.index.setdefault(state, {}).setdefault(symbol, []).append(destination)
+        self.closure_cache = None
 
     def is_deterministic(self):
-        for state in self.states:
-            for symbol in self.alphabet:
-                destinations = self.get_transitions(state, symbol)
+        for by_symbol in self.index.values():
+            if EPSILON in by_symbol:
+                return False
+            for destinations in by_symbol.values():
                 if len(destinations) > 1:
                     return False
 
         return True
 
     def get_transitions(self, state, symbol):
-        destinations = []
-        for (s, sym), dest_states in self.transitions.items():
-            if s == state and sym == symbol:
-                if isinstance(dest_states, list):
-                    destinations.extend(dest_states)
-                else:
-                    destinations.append(dest_states)
-        return destinations
+        by_symbol = self.index.get(state)
+        if by_symbol is None:
+            return []
+        return list(by_symbol.get(symbol, ()))
 
     def to_regular_grammar(self):
         grammar = {}
@@ -51,58 +81,317 @@ class FiniteAutomaton:
 
         return grammar
 
-    def to_dfa(self):
+    def state_ids(self):
+        ids = {}
+        for state in self.states:
+            ids.setdefault(state, len(ids))
+        ids.setdefault(self.start_state, len(ids))
+        for state, by_symbol in self.index.items():
+            ids.setdefault(state, len(ids))
+            for destinations in by_symbol.values():
+                for dest in destinations:
+                    ids.setdefault(dest, len(ids))
+        return ids
+
+    def closure_masks(self):
+        if self.closure_cache is not None:
+            return self.closure_cache
+
+        ids = self.state_ids()
+        successors = [[] for _ in ids]
+        for state, by_symbol in self.index.items():
+            for dest in by_symbol.get(EPSILON, ()):
+                successors[ids[state]].append(ids[dest])
+
+        # Tarjan's SCC algorithm, iterative. SCCs are completed in reverse
+        # topological order, so every SCC reachable from the current one
+        # already has its closure when the current one is popped.
+        order = [-1] * len(ids)
+        low = [0] * len(ids)
+        on_stack = [False] * len(ids)
+        closures = [0] * len(ids)
+        scc_stack = []
+        counter = 0
+
+        for root in range(len(ids)):
+            if order[root] != -1:
+                continue
+
+            work = [(root, 0)]
+            while work:
+                node, child = work.pop()
+                if child == 0:
+                    order[node] = low[node] = counter
+                    counter += 1
+                    scc_stack.append(node)
+                    on_stack[node] = True
+
+                descended = False
+                while child < len(successors[node]):
+                    succ = successors[node][child]
+                    child += 1
+                    if order[succ] == -1:
+                        work.append((node, child))
+                        work.append((succ, 0))
+                        descended = True
+                        break
+                    if on_stack[succ]:
+                        low[node] = min(low[node], order[succ])
+
+                if descended:
+                    continue
+
+                if low[node] == order[node]:
+                    members = []
+                    while True:
+                        member = scc_stack.pop()
+                        on_stack[member] = False
+                        members.append(member)
+                        if member == node:
+                            break
+
+                    mask = 0
+                    for member in members:
+                        mask |= 1 << member
+                        for succ in successors[member]:
+                            mask |= closures[succ]
+                    for member in members:
+                        closures[member] = mask
+
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+
+        self.closure_cache = (ids, closures)
+        return self.closure_cache
+
+    def epsilon_closure(self, states):
+        ids, closures = self.closure_masks()
+        names = list(ids)
+
+        mask = 0
+        for state in states:
+            mask |= closures[ids[state]]
+
+        closure = set()
+        while mask:
+            lowest = mask & -mask
+            closure.add(names[lowest.bit_length() - 1])
+            mask ^= lowest
+        return closure
+
+    def to_dfa(self, max_states=None):
         if self.is_deterministic():
             return self
 
-        dfa_states = []
+        ids, closures = self.closure_masks()
+        symbols = [symbol for symbol in self.alphabet if symbol != EPSILON]
+
+        # Destinations are stored already closed under ε, so the union of
+        # moves out of a closed subset is itself closed and no per-subset
+        # closure pass is needed during the search.
+        moves = [[0] * len(ids) for _ in symbols]
+        for state, by_symbol in self.index.items():
+            for k, symbol in enumerate(symbols):
+                for dest in by_symbol.get(symbol, ()):
+                    moves[k][ids[state]] |= closures[ids[dest]]
+
+        final_mask = 0
+        for state in self.final_states:
+            if state in ids:
+                final_mask |= 1 << ids[state]
+
+        start_closure = closures[ids[self.start_state]]
+        dfa_states = {start_closure: 0}
+        dfa_names = ["q0"]
         dfa_transitions = {}
-        dfa_final_states = []
-
-        start_closure = frozenset([self.start_state])
-        unprocessed_states = [start_closure]
-        dfa_states.append(start_closure)
+        unprocessed_states = deque([start_closure])
 
         while unprocessed_states:
-            current_state = unprocessed_states.pop(0)
-
-            for symbol in self.alphabet:
-                next_state_set = set()
-
-
-                for state in current_state:
-                    next_states = self.get_transitions(state, symbol)
-                    next_state_set.update(next_states)
-
-                if not next_state_set:
+            current_state = unprocessed_states.popleft()
+            current_name = dfa_names[dfa_states[current_state]]
+
+            members = []
+            remaining = current_state
+            while remaining:
+                lowest = remaining & -remaining
+                members.append(lowest.bit_length() - 1)
+                remaining ^= lowest
+
+            for symbol, symbol_moves in zip(symbols, moves):
+                next_state = 0
+                for member in members:
+                    next_state |= symbol_moves[member]
+
+                if not next_state:
                     continue
 
-                next_state = frozenset(next_state_set)
-
-                dfa_transitions[(current_state, symbol)] = next_state
-
-                if next_state not in dfa_states:
-                    dfa_states.append(next_state)
+                next_id = dfa_states.get(next_state)
+                if next_id is None:
+                    if max_states is not None and len(dfa_states) >= max_states:
+                        raise StateLimitExceeded(max_states)
+                    next_id = len(dfa_names)
+                    dfa_states[next_state] = next_id
+                    dfa_names.append(f"q{next_id}")
                     unprocessed_states.append(next_state)
 
-        for state in dfa_states:
-            if any(s in self.final_states for s in state):
-                dfa_final_states.append(state)
+                dfa_transitions[(current_name, symbol)] = dfa_names[next_id]
 
-        state_map = {state: f"q{i}" for i, state in enumerate(dfa_states)}
+        return FiniteAutomaton(
+            states=dfa_names,
+            alphabet=symbols,
+            transitions=dfa_transitions,
+            start_state=dfa_names[0],
+            final_states=[dfa_names[i] for state, i in dfa_states.items() if state & final_mask]
+        )
 
-        new_transitions = {}
-        for (state, symbol), next_state in dfa_transitions.items():
-            new_transitions[(state_map[state], symbol)] = state_map[next_state]
+    def minimize(self, algorithm='hopcroft'):
+        dfa = self.to_dfa()
+        symbols = [symbol for symbol in dfa.alphabet if symbol != EPSILON]
+
+        names = [dfa.start_state]
+        ids = {dfa.start_state: 0}
+        unprocessed_states = deque([dfa.start_state])
+        while unprocessed_states:
+            state = unprocessed_states.popleft()
+            by_symbol = dfa.index.get(state, {})
+            for symbol in symbols:
+                for dest in by_symbol.get(symbol, ()):
+                    if dest not in ids:
+                        ids[dest] = len(names)
+                        names.append(dest)
+                        unprocessed_states.append(dest)
+
+        # Missing transitions go to an explicit dead state so that every
+        # row of the table is total; its class is dropped again below.
+        dead = len(names)
+        delta = [[dead] * (dead + 1) for _ in symbols]
+        for state, i in ids.items():
+            by_symbol = dfa.index.get(state, {})
+            for k, symbol in enumerate(symbols):
+                destinations = by_symbol.get(symbol)
+                if destinations:
+                    delta[k][i] = ids[destinations[0]]
+
+        accepting = [False] * (dead + 1)
+        for state in dfa.final_states:
+            if state in ids:
+                accepting[ids[state]] = True
+
+        if algorithm == 'hopcroft':
+            block_of = self.hopcroft_partition(delta, accepting)
+        elif algorithm == 'moore':
+            block_of = self.moore_partition(delta, accepting)
+        else:
+            raise ValueError(f"unknown minimization algorithm: {algorithm}")
+
+        dead_block = block_of[dead]
+        class_names = {block_of[0]: "q0"}
+        class_order = [0]
+        min_transitions = {}
+        for i in class_order:
+            source = class_names[block_of[i]]
+            if block_of[i] == dead_block:
+                continue
+            for k, symbol in enumerate(symbols):
+                target_block = block_of[delta[k][i]]
+                if target_block == dead_block:
+                    continue
+                if target_block not in class_names:
+                    class_names[target_block] = f"q{len(class_names)}"
+                    class_order.append(delta[k][i])
+                min_transitions[(source, symbol)] = class_names[target_block]
 
         return FiniteAutomaton(
-            states=[state_map[state] for state in dfa_states],
-            alphabet=self.alphabet,
-            transitions=new_transitions,
-            start_state=state_map[dfa_states[0]],
-            final_states=[state_map[state] for state in dfa_final_states]
+            states=[class_names[block_of[i]] for i in class_order],
+            alphabet=symbols,
+            transitions=min_transitions,
+            start_state="q0",
+            final_states=[class_names[block_of[i]] for i in class_order if accepting[i]]
         )
 
+    @staticmethod
+    def hopcroft_partition(delta, accepting):
+        total = len(accepting)
+
+        # Inverse transitions per symbol in CSR form: the sources that move
+        # into state t are sources[k][offsets[k][t]:offsets[k][t + 1]].
+        offsets = []
+        sources = []
+        for row in delta:
+            counts = [0] * (total + 1)
+            for target in row:
+                counts[target + 1] += 1
+            for t in range(total):
+                counts[t + 1] += counts[t]
+            fill = counts[:-1]
+            by_target = [0] * total
+            for source, target in enumerate(row):
+                by_target[fill[target]] = source
+                fill[target] += 1
+            offsets.append(counts)
+            sources.append(by_target)
+
+        finals = {i for i in range(total) if accepting[i]}
+        others = set(range(total)) - finals
+        blocks = [block for block in (finals, others) if block]
+        block_of = [0] * total
+        for b, block in enumerate(blocks):
+            for i in block:
+                block_of[i] = b
+
+        worklist = deque([min(range(len(blocks)), key=lambda b: len(blocks[b]))])
+        in_worklist = set(worklist)
+
+        while worklist:
+            current = worklist.popleft()
+            in_worklist.discard(current)
+            splitter = list(blocks[current])
+            for k in range(len(delta)):
+                starts = offsets[k]
+                by_target = sources[k]
+                touched = {}
+                for t in splitter:
+                    for j in range(starts[t], starts[t + 1]):
+                        source = by_target[j]
+                        touched.setdefault(block_of[source], []).append(source)
+
+                for b, members in touched.items():
+                    if len(members) == len(blocks[b]):
+                        continue
+                    moved = set(members)
+                    blocks[b] -= moved
+                    new_block = len(blocks)
+                    blocks.append(moved)
+                    for i in moved:
+                        block_of[i] = new_block
+
+                    if b in in_worklist or len(moved) <= len(blocks[b]):
+                        worklist.append(new_block)
+                        in_worklist.add(new_block)
+                    else:
+                        worklist.append(b)
+                        in_worklist.add(b)
+
+        return block_of
+
+    @staticmethod
+    def moore_partition(delta, accepting):
+        block_of = [1 if final else 0 for final in accepting]
+        block_count = len(set(block_of))
+
+        while True:
+            signatures = {}
+            refined = []
+            for i in range(len(accepting)):
+                signature = (block_of[i],) + tuple(block_of[row[i]] for row in delta)
+                refined.append(signatures.setdefault(signature, len(signatures)))
+
+            block_of = refined
+            if len(signatures) == block_count:
+                return block_of
+            block_count = len(signatures)
+
     def visualize(self):
         dot = graphviz.Digraph(comment='Finite Automaton')
 
@@ -125,43 +414,47 @@ class FiniteAutomaton:
         return dot
 
 
-
-states = ['q0', 'q1', 'q2', 'q3']
-alphabet = ['a', 'b', 'c']
-transitions = {
-    ('q0', 'a'): ['q0', 'q1'],
-    ('q1', 'b'): 'q2',
-    ('q2', 'a'): 'q2',
-    ('q2', 'b'): 'q3',
-    ('q2', 'c'): 'q0'
-}
-start_state = 'q0'
-final_states = ['q3']
-
-fa = FiniteAutomaton(states, alphabet, transitions, start_state, final_states)
-
-grammar = fa.to_regular_grammar()
-print("Regular Grammar:")
-for non_terminal, productions in grammar.items():
-    for production in productions:
-        print(f"{non_terminal} → {production}")
-
-is_dfa = fa.is_deterministic()
-print(f"\nIs the FA deterministic? {'Yes' if is_dfa else 'No'}")
-print("Because the state 'q0' and input 'a' can lead to multiple states: q0 and q1")
-
-if not is_dfa:
-    print("\nConverting NDFA to DFA...")
-    dfa = fa.to_dfa()
-    print("DFA states:", dfa.states)
-    print("DFA transitions:")
-    for (state, symbol), dest in dfa.transitions.items():
-        print(f"δ({state}, {symbol}) = {dest}")
-    print("DFA final states:", dfa.final_states)
-
-fa_visual = fa.visualize()
-fa_visual.render('fa', format='png', cleanup=True)
-
-if not is_dfa:
-    dfa_visual = dfa.visualize()
-    dfa_visual.render('dfa', format='png', cleanup=True)
\ No newline at end of file
+def main():
+    states = ['q0', 'q1', 'q2', 'q3']
+    alphabet = ['a', 'b', 'c']
+    transitions = {
+        ('q0', 'a'): ['q0', 'q1'],
+        ('q1', 'b'): 'q2',
+        ('q2', 'a'): 'q2',
+        ('q2', 'b'): 'q3',
+        ('q2', 'c'): 'q0'
+    }
+    start_state = 'q0'
+    final_states = ['q3']
+
+    fa = FiniteAutomaton(states, alphabet, transitions, start_state, final_states)
+
+    grammar = fa.to_regular_grammar()
+    print("Regular Grammar:")
+    for non_terminal, productions in grammar.items():
+        for production in productions:
+            print(f"{non_terminal} → {production}")
+
+    is_dfa = fa.is_deterministic()
+    print(f"\nIs the FA deterministic? {'Yes' if is_dfa else 'No'}")
+    print("Because the state 'q0' and input 'a' can lead to multiple states: q0 and q1")
+
+    if not is_dfa:
+        print("\nConverting NDFA to DFA...")
+        dfa = fa.to_dfa()
+        print("DFA states:", dfa.states)
+        print("DFA transitions:")
+        for (state, symbol), dest in dfa.transitions.items():
+            print(f"δ({state}, {symbol}) = {dest}")
+        print("DFA final states:", dfa.final_states)
+
+    fa_visual = fa.visualize()
+    fa_visual.render('fa', format='png', cleanup=True)
+
+    if not is_dfa:
+        dfa_visual = dfa.visualize()
+        dfa_visual.render('dfa', format='png', cleanup=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import os
+import random
+import time
+import tracemalloc
+
+from expression import compile_expression, evaluate, parse
+from lexer import FastLexer, Lexer, Token, TokenBuffer, lex_parallel
+
+
+def random_expression(rng, terms=8):
+    parts = []
+    for _ in range(terms):
+        choice = rng.random()
+        if choice < 0.4:
+            parts.append(str(rng.randint(0, 10 ** 6)))
+        elif choice < 0.6:
+            parts.append(f"{rng.random() * 1000:.4f}")
+        else:
+            parts.append(f"{rng.choice(['sin', 'cos', 'tg', 'ctg', 'log'])}({rng.randint(0, 99)})")
+        parts.append(rng.choice(['+', '-', '*', '/', '^']))
+    return ' '.join(parts[:-1])
+
+
+def expression_file(size, seed=0):
+    rng = random.Random(seed)
+    lines = []
+    total = 0
+    while total < size:
+        line = random_expression(rng)
+        lines.append(line)
+        total += len(line) + 1
+    return '\n'.join(lines)
+
+
+def bench_engines(size=2_000_000):
+    text = expression_file(size)
+    megabytes = len(text) / 1e6
+    print(f"Lexing {megabytes:.1f} MB of expressions:")
+
+    results = []
+    for engine in (Lexer, FastLexer):
+        start = time.perf_counter()
+        tokens, error = engine(text).make_tokens()
+        elapsed = time.perf_counter() - start
+        results.append([repr(token) for token in tokens])
+        print(f"  {engine.__name__:10s} {elapsed:7.3f}s  {megabytes / elapsed:7.2f} MB/s  {len(tokens)} tokens")
+
+    assert results[0] == results[1]
+
+    start = time.perf_counter()
+    buffer, error = FastLexer(text).make_token_buffer()
+    elapsed = time.perf_counter() - start
+    print(f"  {'TokenBuffer':10s} {elapsed:7.3f}s  {megabytes / elapsed:7.2f} MB/s  {len(buffer)} tokens")
+
+
+class DictToken:
+    # The pre-__slots__ token layout: a per-instance __dict__ and a string tag.
+    def __init__(self, type_, value=None, start=None, end=None):
+        self.type = type_
+        self.value = value
+        self.start = start
+        self.end = end
+
+
+def measure(build):
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def bench_token_memory(size=1_000_000):
+    text = expression_file(size)
+    tokens, _ = FastLexer(text).make_tokens()
+    count = len(tokens)
+    print(f"Memory per token over {count} tokens (values and offsets shared):")
+
+    formats = [
+        ("dict Token", lambda: [DictToken(t.type.name, t.value, t.start, t.end) for t in tokens]),
+        ("slotted Token", lambda: [Token(t.type, t.value, t.start, t.end) for t in tokens]),
+        ("TokenBuffer", lambda: TokenBuffer.from_tokens(tokens)),
+    ]
+    for name, build in formats:
+        _, used = measure(build)
+        print(f"  {name:14s} {used / count:7.1f} bytes/token")
+
+
+def bench_parallel(size=8_000_000):
+    text = expression_file(size)
+    megabytes = len(text) / 1e6
+    print(f"Parallel lexing of {megabytes:.1f} MB:")
+
+    start = time.perf_counter()
+    FastLexer(text).make_token_buffer()
+    serial = time.perf_counter() - start
+    print(f"  serial        {serial:7.3f}s  {megabytes / serial:7.2f} MB/s")
+
+    processes = 1
+    while processes <= (os.cpu_count() or 1):
+        start = time.perf_counter()
+        lex_parallel(text, processes=processes)
+        elapsed = time.perf_counter() - start
+        print(f"  {processes:2d} processes  {elapsed:7.3f}s  {megabytes / elapsed:7.2f} MB/s  speedup {serial / elapsed:5.2f}x")
+        processes *= 2
+
+
+def bench_evaluation(evaluations=10 ** 7, sample=10 ** 5, chunk=10 ** 6):
+    import numpy as np
+
+    text = "sin(x) ^ 2 + cos(y) * log(x + 1) - x / (y + 2) ^ 3"
+    variables = ('x', 'y')
+    print(f"Evaluating '{text}' {evaluations:,} times:")
+
+    rng = np.random.default_rng(0)
+    xs = rng.random(sample)
+    ys = rng.random(sample)
+
+    node, _ = parse(text, variables)
+    start = time.perf_counter()
+    for x, y in zip(xs.tolist(), ys.tolist()):
+        evaluate(node, {'x': x, 'y': y})
+    walk = (time.perf_counter() - start) * evaluations / sample
+    print(f"  tree walk        {walk:8.3f}s (extrapolated from {sample:,})")
+
+    scalar, _ = compile_expression(text, variables, backend='math')
+    start = time.perf_counter()
+    for x, y in zip(xs.tolist(), ys.tolist()):
+        scalar(x, y)
+    compiled = (time.perf_counter() - start) * evaluations / sample
+    print(f"  compiled scalar  {compiled:8.3f}s (extrapolated from {sample:,})")
+
+    vectorized, _ = compile_expression(text, variables, backend='numpy')
+    x_chunk = rng.random(chunk)
+    y_chunk = rng.random(chunk)
+    start = time.perf_counter()
+    for _ in range(evaluations // chunk):
+        vectorized(x_chunk, y_chunk)
+    elapsed = time.perf_counter() - start
+    print(f"  compiled numpy   {elapsed:8.3f}s  speedup over tree walk {walk / elapsed:6.1f}x")
+
+
+def main():
+    bench_engines()
+    bench_token_memory()
+    bench_parallel()
+    bench_evaluation()
+
+
+if __name__ == "__main__":
+    main()
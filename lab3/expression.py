@@ -0,0 +1,325 @@
+import math
+
+from lexer import (
+    TT_COS, TT_CTG, TT_DIV, TT_FLOAT, TT_INT, TT_LOG, TT_LPAREN, TT_MINUS, TT_MUL, TT_PLUS, TT_POW,
+    TT_RPAREN, TT_SIN, TT_TG, TT_VAR, Error, Lexer, LineIndex, Position,
+)
+
+BINARY_PRECEDENCE = {
+    TT_PLUS: 10,
+    TT_MINUS: 10,
+    TT_MUL: 20,
+    TT_DIV: 20,
+    TT_POW: 30,
+}
+RIGHT_ASSOCIATIVE = {TT_POW}
+# Prefix minus and unparenthesised function application bind tighter than
+# * and / but looser than ^, so -2^2 is -(2^2) and sin x^2 is sin(x^2).
+# A parenthesised argument is the call's whole operand, so sin(x)^2 is
+# (sin x)^2.
+PREFIX_PRECEDENCE = 25
+ATOM_PRECEDENCE = 100
+# Nesting depth after which compiled source spills into a temporary.
+SPILL_DEPTH = 50
+FUNCTIONS = {TT_SIN, TT_COS, TT_TG, TT_CTG, TT_LOG}
+
+OPERATOR_SOURCE = {
+    TT_PLUS: '+',
+    TT_MINUS: '-',
+    TT_MUL: '*',
+    TT_DIV: '/',
+    TT_POW: '**',
+}
+FUNCTION_SOURCE = {
+    TT_SIN: 'sin({})',
+    TT_COS: 'cos({})',
+    TT_TG: 'tan({})',
+    TT_CTG: '(1 / tan({}))',
+    TT_LOG: 'log({})',
+}
+
+
+class InvalidSyntaxError(Error):
+
+    def __init__(self, pos_start, pos_end, details):
+        super().__init__(pos_start, pos_end, 'Invalid Syntax', details)
+
+
+class ParseFailure(Exception):
+
+    def __init__(self, error):
+        super().__init__(error.details)
+        self.error = error
+
+
+class NumberNode:
+
+    def __init__(self, value):
+        self.value = value
+
+    def __repr__(self):
+        return f'{self.value}'
+
+
+class VariableNode:
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+
+class UnaryOpNode:
+
+    def __init__(self, op, operand):
+        self.op = op
+        self.operand = operand
+
+    def __repr__(self):
+        return f'({self.op.name}, {self.operand})'
+
+
+class BinOpNode:
+
+    def __init__(self, left, op, right):
+        self.left = left
+        self.op = op
+        self.right = right
+
+    def __repr__(self):
+        return f'({self.left}, {self.op.name}, {self.right})'
+
+
+class CallNode:
+
+    def __init__(self, function, argument):
+        self.function = function
+        self.argument = argument
+
+    def __repr__(self):
+        return f'{self.function.name}({self.argument})'
+
+
+class Parser:
+    def __init__(self, tokens, text=''):
+        self.tokens = tokens
+        self.index = 0
+        self.lines = LineIndex(text)
+        self.text_length = len(text)
+
+    def parse(self):
+        try:
+            node = self.expression(0)
+            if self.index < len(self.tokens):
+                raise self.failure("Expected an operator or end of input")
+        except ParseFailure as failure:
+            return None, failure.error
+        except RecursionError:
+            # Chains of + - * / are parsed iteratively; only deep nesting of
+            # parentheses, prefix operators or ^ recurses this far.
+            return None, self.failure("Expression is nested too deeply").error
+        return node, None
+
+    def failure(self, details):
+        if self.index < len(self.tokens):
+            token = self.tokens[self.index]
+            start, end = token.start, token.end
+        else:
+            start = end = self.text_length
+        return ParseFailure(InvalidSyntaxError(Position(start, self.lines), Position(end, self.lines), details))
+
+    def peek(self):
+        if self.index < len(self.tokens):
+            return self.tokens[self.index].type
+        return None
+
+    def expression(self, min_precedence):
+        left = self.prefix()
+
+        while True:
+            op = self.peek()
+            precedence = BINARY_PRECEDENCE.get(op)
+            if precedence is None or precedence < min_precedence:
+                return left
+
+            self.index += 1
+            next_precedence = precedence if op in RIGHT_ASSOCIATIVE else precedence + 1
+            left = BinOpNode(left, op, self.expression(next_precedence))
+
+    def prefix(self):
+        token_type = self.peek()
+        if token_type is None:
+            raise self.failure("Expected an expression")
+
+        token = self.tokens[self.index]
+        self.index += 1
+
+        if token_type in (TT_INT, TT_FLOAT):
+            return NumberNode(token.value)
+        if token_type == TT_VAR:
+            return VariableNode(token.value)
+        if token_type in (TT_PLUS, TT_MINUS):
+            return UnaryOpNode(token_type, self.expression(PREFIX_PRECEDENCE))
+        if token_type in FUNCTIONS:
+            if self.peek() == TT_LPAREN:
+                return CallNode(token_type, self.prefix())
+            return CallNode(token_type, self.expression(PREFIX_PRECEDENCE))
+        if token_type == TT_LPAREN:
+            node = self.expression(0)
+            if self.peek() != TT_RPAREN:
+                raise self.failure("Expected ')'")
+            self.index += 1
+            return node
+
+        self.index -= 1
+        raise self.failure("Expected a number, variable, function or '('")
+
+
+def parse(text, variables=()):
+    tokens, error = Lexer(text, variables).make_tokens()
+    if error:
+        return None, error
+    return Parser(tokens, text).parse()
+
+
+def children(node):
+    if isinstance(node, BinOpNode):
+        return node.left, node.right
+    if isinstance(node, UnaryOpNode):
+        return node.operand,
+    if isinstance(node, CallNode):
+        return node.argument,
+    return ()
+
+
+def postorder(node):
+    # Explicit stack, so arbitrarily deep trees (machine-generated sums of
+    # thousands of terms) never hit the recursion limit.
+    stack = [(node, False)]
+    while stack:
+        node, visited = stack.pop()
+        if visited:
+            yield node
+            continue
+        stack.append((node, True))
+        stack.extend((child, False) for child in reversed(children(node)))
+
+
+def evaluate(node, env):
+    values = []
+    for node in postorder(node):
+        if isinstance(node, NumberNode):
+            values.append(node.value)
+        elif isinstance(node, VariableNode):
+            values.append(env[node.name])
+        elif isinstance(node, UnaryOpNode):
+            if node.op == TT_MINUS:
+                values[-1] = -values[-1]
+        elif isinstance(node, CallNode):
+            value = values.pop()
+            if node.function == TT_SIN:
+                values.append(math.sin(value))
+            elif node.function == TT_COS:
+                values.append(math.cos(value))
+            elif node.function == TT_TG:
+                values.append(math.tan(value))
+            elif node.function == TT_CTG:
+                values.append(1 / math.tan(value))
+            else:
+                values.append(math.log(value))
+        else:
+            right = values.pop()
+            left = values.pop()
+            if node.op == TT_PLUS:
+                values.append(left + right)
+            elif node.op == TT_MINUS:
+                values.append(left - right)
+            elif node.op == TT_MUL:
+                values.append(left * right)
+            elif node.op == TT_DIV:
+                values.append(left / right)
+            else:
+                values.append(left ** right)
+    return values[0]
+
+
+def to_source(node, variables, statements=None):
+    # Variables become positional parameters v0, v1, ... so that any name the
+    # lexer accepts is safe to use, including Python keywords. Parentheses
+    # are emitted only where precedence or associativity requires them; the
+    # precedences above order +, *, prefix minus and ^ the same way Python
+    # does. Given a statements list, subexpressions nested deeper than
+    # SPILL_DEPTH are assigned to temporaries t0, t1, ... so that the Python
+    # compiler's nesting and recursion limits are never reached.
+    results = []
+    for node in postorder(node):
+        if isinstance(node, NumberNode):
+            if isinstance(node.value, float) and not math.isfinite(node.value):
+                source = f"float('{node.value!r}')"
+            else:
+                source = repr(node.value)
+            precedence, depth = ATOM_PRECEDENCE, 0
+        elif isinstance(node, VariableNode):
+            source = f'v{variables.index(node.name)}'
+            precedence, depth = ATOM_PRECEDENCE, 0
+        elif isinstance(node, UnaryOpNode):
+            operand, operand_precedence, depth = results.pop()
+            if operand_precedence < PREFIX_PRECEDENCE:
+                operand = f'({operand})'
+            source = f'{OPERATOR_SOURCE[node.op]}{operand}'
+            precedence, depth = PREFIX_PRECEDENCE, depth + 1
+        elif isinstance(node, CallNode):
+            argument, _, depth = results.pop()
+            source = FUNCTION_SOURCE[node.function].format(argument)
+            precedence, depth = ATOM_PRECEDENCE, depth + 1
+        else:
+            right, right_precedence, right_depth = results.pop()
+            left, left_precedence, left_depth = results.pop()
+            precedence = BINARY_PRECEDENCE[node.op]
+            right_associative = node.op in RIGHT_ASSOCIATIVE
+            if left_precedence < precedence or (left_precedence == precedence and right_associative):
+                left = f'({left})'
+            if right_precedence < precedence or (right_precedence == precedence and not right_associative):
+                right = f'({right})'
+            source = f'{left} {OPERATOR_SOURCE[node.op]} {right}'
+            depth = max(left_depth, right_depth) + 1
+
+        if statements is not None and depth >= SPILL_DEPTH:
+            name = f't{len(statements)}'
+            statements.append(f'{name} = {source}')
+            source, precedence, depth = name, ATOM_PRECEDENCE, 0
+        results.append((source, precedence, depth))
+    return results[0][0]
+
+
+def backend_namespace(backend):
+    if backend == 'math':
+        return {'sin': math.sin, 'cos': math.cos, 'tan': math.tan, 'log': math.log}
+    if backend == 'numpy':
+        import numpy as np
+        # Arguments are coerced to float arrays so that, as in evaluate, a
+        # negative power of an integer is a float rather than a ValueError.
+        return {'sin': np.sin, 'cos': np.cos, 'tan': np.tan, 'log': np.log,
+                'coerce': lambda value: np.asarray(value, dtype=np.float64)}
+    raise ValueError(f"unknown backend: {backend}")
+
+
+def compile_expression(text, variables=(), backend='numpy'):
+    variables = list(variables)
+    node, error = parse(text, variables)
+    if error:
+        return None, error
+
+    namespace = backend_namespace(backend)
+    parameters = [f'v{i}' for i in range(len(variables))]
+    lines = [f"def expression({', '.join(parameters)}):"]
+    if 'coerce' in namespace:
+        lines.extend(f'    {name} = coerce({name})' for name in parameters)
+    statements = []
+    result = to_source(node, variables, statements)
+    lines.extend(f'    {statement}' for statement in statements)
+    lines.append(f'    return {result}')
+
+    exec(compile('\n'.join(lines), '<expression>', 'exec'), namespace)
+    return namespace['expression'], None
@@ -1,17 +1,44 @@
-TT_INT = 'INT'
-TT_FLOAT = 'FLOAT'
-TT_PLUS = 'PLUS'
-TT_MINUS = 'MINUS'
-TT_MUL = 'MUL'
-TT_DIV = 'DIV'
-TT_POW = 'POW'
-TT_LOG = 'LOG'
-TT_COS = 'COS'
-TT_SIN = 'SIN'
-TT_TG = 'TG'
-TT_CTG = 'CTG'
-TT_LPAREN = 'LPAREN'
-TT_RPAREN = 'RPAREN'
+import re
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from enum import IntEnum
+
+
+class TokenType(IntEnum):
+    INT = 0
+    FLOAT = 1
+    PLUS = 2
+    MINUS = 3
+    MUL = 4
+    DIV = 5
+    POW = 6
+    LOG = 7
+    COS = 8
+    SIN = 9
+    TG = 10
+    CTG = 11
+    LPAREN = 12
+    RPAREN = 13
+    VAR = 14
+
+
+TT_INT = TokenType.INT
+TT_FLOAT = TokenType.FLOAT
+TT_PLUS = TokenType.PLUS
+TT_MINUS = TokenType.MINUS
+TT_MUL = TokenType.MUL
+TT_DIV = TokenType.DIV
+TT_POW = TokenType.POW
+TT_LOG = TokenType.LOG
+TT_COS = TokenType.COS
+TT_SIN = TokenType.SIN
+TT_TG = TokenType.TG
+TT_CTG = TokenType.CTG
+TT_LPAREN = TokenType.LPAREN
+TT_RPAREN = TokenType.RPAREN
+TT_VAR = TokenType.VAR
 
 DIGITS = '0123456789'
 WHITESPACE = ' \t\n'
@@ -22,6 +49,27 @@ MATH_FUNCTIONS = {
     'ctg': TT_CTG,
     'log': TT_LOG,
 }
+OPERATORS = {
+    '+': TT_PLUS,
+    '-': TT_MINUS,
+    '*': TT_MUL,
+    '/': TT_DIV,
+    '^': TT_POW,
+    '(': TT_LPAREN,
+    ')': TT_RPAREN,
+}
+
+# Leading whitespace is consumed by every match. Groups, by lastindex:
+# 1 number, 2 operator, 3 letters; no group means the end of the text.
+# [^\W\d_] is a superset of str.isalpha(), so letter runs are trimmed to
+# their isalpha() prefix before use to stay identical to Lexer.
+TOKEN_REGEX = re.compile(
+    r'[ \t\n]*(?:'
+    r'([0-9]+(?:\.[0-9]*)?|\.[0-9]*)'
+    r'|([-+*/^()])'
+    r'|([^\W\d_]+)'
+    r'|\Z)'
+)
 
 
 class Error:
@@ -51,113 +99,230 @@ class UnknownFunctionError(Error):
 
 
 class Token:
+    __slots__ = ('type', 'value', 'start', 'end')
 
-    def __init__(self, type_, value=None):
+    def __init__(self, type_, value=None, start=None, end=None):
         self.type = type_
         self.value = value
+        self.start = start
+        self.end = end
 
     def __repr__(self):
         if self.value is not None:
-            return f'{self.type}:{self.value}'
-        return f'{self.type}'
+            return f'{self.type.name}:{self.value}'
+        return f'{self.type.name}'
+
+
+class TokenBuffer:
+    # Columnar token storage: one entry per token in each parallel array.
+    # Values are kept as doubles; values a double cannot hold (large INTs
+    # and VAR names) are stored in boxed, keyed by token number.
+    def __init__(self):
+        self.types = array('B')
+        self.starts = array('q')
+        self.ends = array('q')
+        self.values = array('d')
+        self.boxed = {}
+
+    @classmethod
+    def from_tokens(cls, tokens):
+        buffer = cls()
+        for token in tokens:
+            buffer.append(token.type, token.value, token.start, token.end)
+        return buffer
+
+    def append(self, type_, value, start, end):
+        if value is None:
+            value = 0.0
+        elif type_ == TT_VAR or (type_ == TT_INT and abs(value) > 2 ** 53):
+            self.boxed[len(self.types)] = value
+            value = 0.0
+        self.types.append(type_)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.values.append(value)
+
+    def extend(self, other):
+        for i, value in other.boxed.items():
+            self.boxed[len(self.types) + i] = value
+        self.types.extend(other.types)
+        self.starts.extend(other.starts)
+        self.ends.extend(other.ends)
+        self.values.extend(other.values)
+
+    def rebase(self, offset):
+        self.starts = array('q', [start + offset for start in self.starts])
+        self.ends = array('q', [end + offset for end in self.ends])
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self.types)
+        type_ = TokenType(self.types[i])
+        if i in self.boxed:
+            value = self.boxed[i]
+        elif type_ == TT_INT:
+            value = int(self.values[i])
+        elif type_ == TT_FLOAT:
+            value = self.values[i]
+        else:
+            value = None
+        return Token(type_, value, self.starts[i], self.ends[i])
+
+    def __iter__(self):
+        for i in range(len(self.types)):
+            yield self[i]
+
+
+class LineIndex:
+    # `text` starts at absolute offset `offset`, on line `first_line`, whose
+    # first character sits at absolute offset `first_line_start`. The
+    # defaults describe a whole document; the streaming tokenizer passes a
+    # window of its input instead.
+    def __init__(self, text, offset=0, first_line=0, first_line_start=0):
+        self.text = text
+        self.offset = offset
+        self.first_line = first_line
+        self.first_line_start = first_line_start
+        self.newlines = None
+
+    def build(self):
+        newlines = []
+        index = self.text.find('\n')
+        while index != -1:
+            newlines.append(index)
+            index = self.text.find('\n', index + 1)
+        self.newlines = newlines
+
+    def local_line_nr(self, index):
+        if self.newlines is None:
+            self.build()
+        return bisect_left(self.newlines, index - self.offset)
+
+    def line_nr(self, index):
+        return self.first_line + self.local_line_nr(index)
+
+    def column_nr(self, index):
+        line_nr = self.local_line_nr(index)
+        if line_nr == 0:
+            return index - self.first_line_start
+        return index - self.offset - self.newlines[line_nr - 1] - 1
 
 
 class Position:
-    def __init__(self, index, line_nr, column_nr):
+    def __init__(self, index, lines):
         self.index = index
-        self.line_nr = line_nr
-        self.column_nr = column_nr
-
-    def advance(self, current_char=None):
-        self.index += 1
-        self.column_nr += 1
+        self.lines = lines
 
-        if current_char == '\n':
-            self.line_nr += 1
-            self.column_nr = 0
+    @property
+    def line_nr(self):
+        return self.lines.line_nr(self.index)
 
-        return self
+    @property
+    def column_nr(self):
+        return self.lines.column_nr(self.index)
 
     def copy(self):
-        return Position(self.index, self.line_nr, self.column_nr)
+        return Position(self.index, self.lines)
 
 
 class Lexer:
-    def __init__(self, text):
+    def __init__(self, text, variables=()):
         self.text = text
-        self.pos = Position(-1, 0, -1)
+        self.variables = frozenset(variables)
+        self.lines = LineIndex(text)
+        self.index = -1
         self.current_char = None
         self.advance()
 
     def advance(self):
-        self.pos.advance(self.current_char)
-        if self.pos.index < len(self.text):
-            self.current_char = self.text[self.pos.index]
+        self.index += 1
+        if self.index < len(self.text):
+            self.current_char = self.text[self.index]
         else:
             self.current_char = None
 
-    def make_tokens(self):
-        tokens = []
-
+    def iter_tokens(self, recover=False):
         while self.current_char is not None:
             if self.current_char in WHITESPACE:
                 self.advance()
             elif self.current_char == '+':
-                tokens.append(Token(TT_PLUS))
+                yield Token(TT_PLUS, None, self.index, self.index + 1)
                 self.advance()
             elif self.current_char == '-':
-                tokens.append(Token(TT_MINUS))
+                yield Token(TT_MINUS, None, self.index, self.index + 1)
                 self.advance()
             elif self.current_char == '*':
-                tokens.append(Token(TT_MUL))
+                yield Token(TT_MUL, None, self.index, self.index + 1)
                 self.advance()
             elif self.current_char == '/':
-                tokens.append(Token(TT_DIV))
+                yield Token(TT_DIV, None, self.index, self.index + 1)
                 self.advance()
             elif self.current_char == '^':
-                tokens.append(Token(TT_POW))
+                yield Token(TT_POW, None, self.index, self.index + 1)
                 self.advance()
             elif self.current_char == '(':
-                tokens.append(Token(TT_LPAREN))
+                yield Token(TT_LPAREN, None, self.index, self.index + 1)
                 self.advance()
             elif self.current_char == ')':
-                tokens.append(Token(TT_RPAREN))
+                yield Token(TT_RPAREN, None, self.index, self.index + 1)
                 self.advance()
             elif self.current_char.isalpha():
                 token_or_error = self.make_function()
-                if isinstance(token_or_error, Error):
-                    return [], token_or_error
-                tokens.append(token_or_error)
+                yield token_or_error
+                if isinstance(token_or_error, Error) and not recover:
+                    return
             elif self.current_char in DIGITS or self.current_char == '.':
-                tokens.append(self.make_number())
+                yield self.make_number()
             else:
-                pos_start = self.pos.copy()
+                pos_start = Position(self.index, self.lines)
                 char = self.current_char
                 self.advance()
                 error = IllegalCharError(
-                    pos_start, self.pos,
+                    pos_start, Position(self.index, self.lines),
                     f"'{char}' is not a valid token"
                 )
-                return [], error
+                yield error
+                if not recover:
+                    return
+
+    def make_tokens(self, recover=False):
+        tokens = []
+        errors = []
+
+        for token_or_error in self.iter_tokens(recover):
+            if isinstance(token_or_error, Error):
+                if not recover:
+                    return [], token_or_error
+                errors.append(token_or_error)
+            else:
+                tokens.append(token_or_error)
 
+        if recover:
+            return tokens, errors
         return tokens, None
 
     def make_function(self):
         func_str = ''
-        pos_start = self.pos.copy()
+        start = self.index
 
         while self.current_char is not None and self.current_char.isalpha():
             func_str += self.current_char
             self.advance()
 
         if func_str in MATH_FUNCTIONS:
-            return Token(MATH_FUNCTIONS[func_str])
+            return Token(MATH_FUNCTIONS[func_str], None, start, self.index)
+        if func_str in self.variables:
+            return Token(TT_VAR, func_str, start, self.index)
 
-        return UnknownFunctionError(pos_start, self.pos, func_str)
+        return UnknownFunctionError(Position(start, self.lines), Position(self.index, self.lines), func_str)
 
     def make_number(self):
         num_str = ''
         dot_count = 0
+        start = self.index
 
         while self.current_char is not None and (self.current_char in DIGITS or self.current_char == '.'):
             if self.current_char == '.':
@@ -169,15 +334,339 @@ class Lexer:
             self.advance()
 
         if dot_count == 0:
-            return Token(TT_INT, int(num_str))
+            return Token(TT_INT, int(num_str), start, self.index)
         else:
-            return Token(TT_FLOAT, float(num_str))
+            return Token(TT_FLOAT, float(num_str), start, self.index)
 
 
-def run(text):
+class FastLexer:
+    def __init__(self, text, variables=()):
+        self.text = text
+        self.variables = frozenset(variables)
+        self.lines = LineIndex(text)
+
+    def position(self, index):
+        return Position(index, self.lines)
+
+    def make_tokens(self, recover=False):
+        tokens = []
+        append = tokens.append
+
+        def emit(type_, value, start, end):
+            append(Token(type_, value, start, end))
+
+        error = self.scan(emit, recover)
+        if error is not None and not recover:
+            return [], error
+        return tokens, error
+
+    def make_token_buffer(self, recover=False):
+        buffer = TokenBuffer()
+        error = self.scan(buffer.append, recover)
+        if error is not None and not recover:
+            return TokenBuffer(), error
+        return buffer, error
+
+    def scan(self, emit, recover=False):
+        # Returns the first error, or None; with recover=True the offending
+        # span is skipped and the list of every error is returned instead.
+        errors = []
+        pos = 0
+
+        while True:
+            error = self.scan_from(pos, emit)
+            if error is None:
+                return errors if recover else None
+            if not recover:
+                return error
+            errors.append(error)
+            pos = error.pos_end.index
+
+    def scan_from(self, pos, emit):
+        text = self.text
+
+        for m in iter(TOKEN_REGEX.scanner(text, pos).match, None):
+            kind = m.lastindex
+            pos = m.end()
+
+            if kind == 2:
+                emit(OPERATORS[m.group(2)], None, pos - 1, pos)
+            elif kind == 1:
+                number = m.group(1)
+                if '.' in number:
+                    emit(TT_FLOAT, float(number), m.start(1), pos)
+                else:
+                    emit(TT_INT, int(number), m.start(1), pos)
+            elif kind == 3:
+                start = m.start(3)
+                name = m.group(3)
+                if not name.isalpha():
+                    length = 0
+                    while name[length].isalpha():
+                        length += 1
+                    name = name[:length]
+                    pos = start + length
+
+                if name:
+                    token_type = MATH_FUNCTIONS.get(name)
+                    if token_type is not None:
+                        emit(token_type, None, start, pos)
+                    elif name in self.variables:
+                        emit(TT_VAR, name, start, pos)
+                    else:
+                        return UnknownFunctionError(self.position(start), self.position(pos), name)
+                if pos < m.end():
+                    break
+            else:
+                return None
+
+        while text[pos] in WHITESPACE:
+            pos += 1
+        return IllegalCharError(
+            self.position(pos), self.position(pos + 1),
+            f"'{text[pos]}' is not a valid token"
+        )
+
+    def iter_tokens(self, recover=False):
+        return iter_tokens(self.text, recover=recover, variables=self.variables)
+
+
+def iter_tokens(source, chunk_size=1 << 16, recover=False, variables=()):
+    if isinstance(source, str):
+        chunks = iter((source,))
+    elif hasattr(source, 'read'):
+        chunks = iter(lambda: source.read(chunk_size), '')
+    else:
+        chunks = iter(source)
+
+    variables = frozenset(variables)
+    buffer = ''
+    offset = 0
+    first_line = 0
+    first_line_start = 0
+    final = False
+
+    while not final:
+        chunk = next(chunks, None)
+        if chunk is None:
+            final = True
+        elif not chunk:
+            continue
+        else:
+            buffer += chunk
+
+        lines = LineIndex(buffer, offset, first_line, first_line_start)
+        end = len(buffer)
+        pos = 0
+
+        while True:
+            m = TOKEN_REGEX.match(buffer, pos)
+            # A match touching the end of the buffer may continue in the
+            # next chunk, so it is only trusted once the input is exhausted.
+            if m is not None and m.end() == end and not final:
+                break
+
+            kind = m.lastindex if m is not None else None
+            if kind == 2:
+                yield Token(OPERATORS[m.group(2)], None, offset + m.end() - 1, offset + m.end())
+            elif kind == 1:
+                number = m.group(1)
+                if '.' in number:
+                    yield Token(TT_FLOAT, float(number), offset + m.start(1), offset + m.end())
+                else:
+                    yield Token(TT_INT, int(number), offset + m.start(1), offset + m.end())
+            elif kind == 3:
+                start = m.start(3)
+                name = m.group(3)
+                if not name.isalpha():
+                    length = 0
+                    while name[length].isalpha():
+                        length += 1
+                    name = name[:length]
+
+                if name:
+                    token_type = MATH_FUNCTIONS.get(name)
+                    if token_type is not None:
+                        yield Token(token_type, None, offset + start, offset + start + len(name))
+                    elif name in variables:
+                        yield Token(TT_VAR, name, offset + start, offset + start + len(name))
+                    else:
+                        yield UnknownFunctionError(
+                            Position(offset + start, lines), Position(offset + start + len(name), lines), name
+                        )
+                        if not recover:
+                            return
+                if start + len(name) < m.end():
+                    pos = start + len(name)
+                    m = None
+            elif m is not None:
+                return
+
+            if m is None:
+                while buffer[pos] in WHITESPACE:
+                    pos += 1
+                yield IllegalCharError(
+                    Position(offset + pos, lines), Position(offset + pos + 1, lines),
+                    f"'{buffer[pos]}' is not a valid token"
+                )
+                if not recover:
+                    return
+                pos += 1
+                continue
+
+            pos = m.end()
+
+        newline_count = buffer.count('\n', 0, pos)
+        if newline_count:
+            first_line += newline_count
+            first_line_start = offset + buffer.rfind('\n', 0, pos) + 1
+        offset += pos
+        buffer = buffer[pos:]
+
+
+def detach_position(position, offset=0, first_line=0):
+    # A Position that no longer references the source text, so errors can be
+    # pickled cheaply between processes. The index is shifted by `offset`
+    # and the line by `first_line`; the column is kept.
+    line_nr = first_line + position.line_nr
+    index = offset + position.index
+    return Position(index, LineIndex('', index, line_nr, index - position.column_nr))
+
+
+def detach_error(error, offset=0, first_line=0):
+    error.pos_start = detach_position(error.pos_start, offset, first_line)
+    error.pos_end = detach_position(error.pos_end, offset, first_line)
+    return error
+
+
+def lex_chunk(text, offset=0, first_line=0, recover=False):
+    buffer, error = FastLexer(text).make_token_buffer(recover)
+    if offset:
+        buffer.rebase(offset)
+    if recover:
+        return buffer, [detach_error(e, offset, first_line) for e in error]
+    if error is not None:
+        error = detach_error(error, offset, first_line)
+    return buffer, error
+
+
+def lex_file(path, recover=False):
+    with open(path) as file:
+        return lex_chunk(file.read(), recover=recover)
+
+
+def split_lines(text, chunk_size):
+    # Newline-aligned chunks: no token can contain a newline, so lexing the
+    # chunks independently gives the same tokens as lexing the whole text.
+    chunks = []
+    start = 0
+    line_nr = 0
+    while start < len(text):
+        end = text.find('\n', start + chunk_size)
+        end = len(text) if end == -1 else end + 1
+        chunks.append((text[start:end], start, line_nr))
+        line_nr += text.count('\n', start, end)
+        start = end
+    return chunks
+
+
+def lex_parallel(text, processes=None, chunk_size=1 << 20, recover=False):
+    chunks = split_lines(text, chunk_size)
+    with ProcessPoolExecutor(processes) as pool:
+        results = pool.map(lex_chunk, *zip(*chunks), [recover] * len(chunks)) if chunks else []
+
+        merged = TokenBuffer()
+        errors = []
+        for buffer, error in results:
+            if recover:
+                errors.extend(error)
+            elif error is not None:
+                return TokenBuffer(), error
+            merged.extend(buffer)
+
+    return merged, errors if recover else None
+
+
+def lex_files(paths, processes=None, recover=False):
+    with ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(lex_file, paths, [recover] * len(paths)))
+
+
+class TokenCache:
+    # LRU cache of run() results keyed by input text. Entries are weighed
+    # by the length of their text and evicted oldest-first once the total
+    # weight exceeds max_size; max_size=0 disables caching.
+    def __init__(self, max_size=1 << 20):
+        self.max_size = max_size
+        self.size = 0
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text):
+        result = self.entries.get(text)
+        if result is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(text)
+        self.hits += 1
+        return result
+
+    def put(self, text, result):
+        weight = len(text) + 1
+        if weight > self.max_size:
+            return
+        if text in self.entries:
+            self.size -= len(text) + 1
+        self.entries[text] = result
+        self.entries.move_to_end(text)
+        self.size += weight
+        self.evict()
+
+    def evict(self):
+        while self.size > self.max_size:
+            text, _ = self.entries.popitem(last=False)
+            self.size -= len(text) + 1
+
+    def resize(self, max_size):
+        self.max_size = max_size
+        self.evict()
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self.entries),
+            'size': self.size,
+            'max_size': self.max_size,
+        }
+
+
+token_cache = TokenCache()
+
+
+def run(text, use_cache=True):
+    # Results are returned as immutable token tuples, since the same
+    # tuple is handed out again on every cache hit.
+    use_cache = use_cache and token_cache.max_size > 0
+    if use_cache:
+        cached = token_cache.get(text)
+        if cached is not None:
+            return cached
+
     lexer = Lexer(text)
     tokens, error = lexer.make_tokens()
-    return tokens, error
+    result = (tuple(tokens), error)
+
+    if use_cache:
+        token_cache.put(text, result)
+    return result
 
 
 def main():
@@ -194,7 +683,7 @@ def main():
             if error:
                 print(error.as_string() if isinstance(error, Error) else error)
             else:
-                print(result)
+                print(list(result))
         except KeyboardInterrupt:
             print("\nProgram terminated by user.")
             break
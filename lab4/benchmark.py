@@ -0,0 +1,131 @@
+import os
+import random
+import re
+import time
+
+from regexpr import RegexCombinationGenerator, RegexTrace, parse_regex
+
+
+def legacy_tokenize(regex_str):
+    """The original per-position tokenizer, kept as a baseline."""
+    pattern = r'([A-Za-z0-9])|(\()|(\))|(\|)|(\?)|(\*)|(\^)|(\([\+]\))'
+    tokens = []
+
+    i = 0
+    while i < len(regex_str):
+        match = re.match(pattern, regex_str[i:])
+        if match and match.group(7) and i + 1 < len(regex_str) and regex_str[i + 1] == '(':
+            end_paren = regex_str.find(')', i + 2)
+            if end_paren != -1:
+                tokens.append(f"^({regex_str[i + 2:end_paren]})")
+                i = end_paren + 1
+                continue
+        tokens.append(regex_str[i])
+        i += 1
+    return tokens
+
+
+def random_pattern(length, seed=0):
+    """A pattern of roughly length characters mixing every construct."""
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    while size < length:
+        if rng.random() < 0.5:
+            part = rng.choice('ABCDEFGH')
+        else:
+            part = '(' + '|'.join(rng.choice('ABCDEFGH') for _ in range(rng.randint(2, 4))) + ')'
+        part += rng.choice(['', '', '?', '*', '^(+)', '^(2)', '^(3)'])
+        parts.append(part)
+        size += len(part)
+    return ''.join(parts)
+
+
+def bench_tokenize(lengths=(10 ** 3, 10 ** 4, 10 ** 5)):
+    generator = RegexCombinationGenerator()
+    print("tokenize:")
+    for length in lengths:
+        pattern = random_pattern(length)
+
+        start = time.perf_counter()
+        expected = legacy_tokenize(pattern)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = generator.tokenize(pattern)
+        compiled_time = time.perf_counter() - start
+
+        assert expected == actual
+        print(f"  {len(pattern):>7} chars  legacy {legacy_time:8.4f}s  "
+              f"compiled {compiled_time:8.4f}s  x{legacy_time / compiled_time:,.0f}")
+
+
+def bench_parse_cache(length=10 ** 5, repeats=20):
+    pattern = random_pattern(length)
+    generator = RegexCombinationGenerator()
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        generator.parse(generator.tokenize(pattern))
+    uncached_time = time.perf_counter() - start
+
+    parse_regex.cache_clear()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        parse_regex(pattern)
+    cached_time = time.perf_counter() - start
+
+    print(f"parse {repeats}x a {len(pattern)}-char pattern:")
+    print(f"  uncached  {uncached_time:8.4f}s")
+    print(f"  cached    {cached_time:8.4f}s")
+
+
+def bench_tracing(patterns=2000, length=200):
+    generator = RegexCombinationGenerator()
+    regexes = [random_pattern(length, seed) for seed in range(patterns)]
+
+    start = time.perf_counter()
+    for regex in regexes:
+        generator.generate_from_regex(regex)
+    plain_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for regex in regexes:
+        generator.generate_from_regex(regex, trace=RegexTrace())
+    traced_time = time.perf_counter() - start
+
+    print(f"generate_from_regex over {patterns} distinct {length}-char patterns:")
+    print(f"  untraced  {plain_time:8.4f}s")
+    print(f"  traced    {traced_time:8.4f}s")
+
+
+def bench_parallel(regex="(A|B|C|D)*(E|F|G)*(H|I)^(+)(J|K|L)?M(N|O|P|Q|R)*", max_repeat=8):
+    generator = RegexCombinationGenerator(max_repeat)
+    total = generator.count(regex)
+    print(f"Generating all {total:,} combinations of {regex} (max_repeat={max_repeat}):")
+
+    start = time.perf_counter()
+    expected = list(generator.iter_combinations(generator.parse(generator.tokenize(regex))))
+    serial = time.perf_counter() - start
+    print(f"  serial        {serial:7.3f}s  {total / serial:12,.0f} combinations/s")
+
+    processes = 1
+    while processes <= (os.cpu_count() or 1):
+        start = time.perf_counter()
+        actual = list(generator.iter_combinations_parallel(regex, processes=processes))
+        elapsed = time.perf_counter() - start
+        assert actual == expected
+        print(f"  {processes:2d} processes  {elapsed:7.3f}s  {total / elapsed:12,.0f} combinations/s  "
+              f"speedup {serial / elapsed:5.2f}x")
+        processes *= 2
+
+
+def main():
+    bench_tokenize()
+    bench_parse_cache()
+    bench_tracing()
+    bench_parallel()
+
+
+if __name__ == "__main__":
+    main()
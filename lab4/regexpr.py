@@ -1,208 +1,584 @@
+import os
 import re
 import random
-from itertools import product
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice, product
 
+# A power such as ^(3) or ^(+) runs from the caret to the first closing
+# parenthesis and is one token; every other character is a token of its own.
+TOKEN_PATTERN = re.compile(r'\^\([^)]*\)|.', re.DOTALL)
 
-class RegexCombinationGenerator:
-    def __init__(self, max_repeat=5):
-        self.max_repeat = max_repeat
-        self.processing_steps = []
-
-    def tokenize(self, regex_str):
-        """Split the regex into tokens for parsing."""
-        self.processing_steps.append(f"Tokenizing regex: {regex_str}")
-
-        pattern = r'([A-Za-z0-9])|(\()|(\))|(\|)|(\?)|(\*)|(\^)|(\([\+]\))'
-        tokens = []
-
-        i = 0
-        while i < len(regex_str):
-            match = re.match(pattern, regex_str[i:])
-            if match:
-                if match.group(8):
-                    tokens.append("^(+)")
-                    i += 3
-                elif match.group(7):
-                    if i + 1 < len(regex_str) and regex_str[i + 1] == '(':
-                        end_paren = regex_str.find(')', i + 2)
-                        if end_paren != -1:
-                            power = regex_str[i + 2:end_paren]
-                            tokens.append(f"^({power})")
-                            i = end_paren + 1
-                        else:
-                            tokens.append(regex_str[i])
-                            i += 1
-                    else:
-                        tokens.append(regex_str[i])
-                        i += 1
-                else:
-                    tokens.append(regex_str[i])
-                    i += 1
-            else:
-                tokens.append(regex_str[i])
-                i += 1
-
-        self.processing_steps.append(f"Tokens: {tokens}")
-        return tokens
+# Largest run of combinations that iter_range enumerates with product after
+# decoding a single index; bounds both the expansion and the skip at a start.
+BLOCK_LIMIT = 1 << 16
 
-    def parse(self, tokens):
-        """Parse tokens into a structured representation."""
-        self.processing_steps.append("Starting to parse tokens")
 
-        def parse_group():
-            nonlocal i
-            i += 1
+class RegexParser:
+    """Recursive-descent parser for the regex dialect, with groups nested to any depth."""
 
-            options = [[]]
-            current_option = 0
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.index = 0
+        self.nodes = {}
 
-            while i < len(tokens) and tokens[i] != ')':
-                if tokens[i] == '|':
-                    options.append([])
-                    current_option += 1
-                    i += 1
-                else:
-                    options[current_option].append(tokens[i])
-                    i += 1
+    def parse(self):
+        """Parse the whole token list into a list of elements."""
+        # Outside any group ')' and '|' have no meaning and stay literal chars.
+        return self.sequence(top_level=True)
 
-            i += 1
-            return {'type': 'group', 'options': options}
+    def node(self, key, node):
+        """Return the single shared node for a subtree, so identical subtrees are one object."""
+        return self.nodes.setdefault(key, node)
 
+    def sequence(self, top_level=False):
+        """Parse elements up to the next '|' or ')' of the enclosing group."""
         result = []
-        i = 0
-
-        while i < len(tokens):
-            token = tokens[i]
+        while self.index < len(self.tokens):
+            token = self.tokens[self.index]
+            if not top_level and token in ('|', ')'):
+                break
+            self.index += 1
 
             if token == '(':
-                group = parse_group()
-                result.append(group)
-            elif token == '?':
+                result.append(self.group())
+            elif token in ('?', '*') or token.startswith('^'):
                 if result:
-                    prev = result.pop()
-                    result.append({'type': 'optional', 'element': prev})
-                i += 1
-            elif token == '*':
-                if result:
-                    prev = result.pop()
-                    result.append({'type': 'star', 'element': prev})
-                i += 1
-            elif token.startswith('^'):
-                if result and token[1:] == "(+)":
-                    prev = result.pop()
-                    result.append({'type': 'one_or_more', 'element': prev})
-                elif result:
-                    power = int(token[2:-1])
-                    prev = result.pop()
-                    result.append({'type': 'power', 'element': prev, 'power': power})
-                i += 1
+                    result.append(self.quantify(result.pop(), token))
             else:
-                result.append({'type': 'char', 'value': token})
-                i += 1
-
-        self.processing_steps.append(f"Parsed structure: {result}")
+                result.append(self.node(('char', token), {'type': 'char', 'value': token}))
         return result
 
-    def generate_combinations(self, parsed_regex, max_results=10):
-        """Generate combinations based on the parsed regex."""
-        self.processing_steps.append("Starting to generate combinations")
-
-        def expand_element(element):
-            if element['type'] == 'char':
-                return [[element['value']]]
-
-            elif element['type'] == 'group':
-                options = []
-                for option in element['options']:
-                    option_combinations = [[]]
-                    for item in option:
-                        item_combinations = expand_element({'type': 'char', 'value': item})
-                        new_combinations = []
-                        for combo in option_combinations:
-                            for item_combo in item_combinations:
-                                new_combinations.append(combo + item_combo)
-                        option_combinations = new_combinations
-                    options.extend(option_combinations)
-                return options
-
-            elif element['type'] == 'optional':
-                inner_combinations = expand_element(element['element'])
-                return [[], *inner_combinations]
-
-            elif element['type'] == 'star':
-                inner_combinations = expand_element(element['element'])
-                results = [[]]
-
-                for repeat_count in range(1, self.max_repeat + 1):
-                    for inner_combo in inner_combinations:
-                        repeated = inner_combo * repeat_count
-                        results.append(repeated)
+    def group(self):
+        """Parse the options of a group whose '(' has been consumed."""
+        options = [self.sequence()]
+        while self.index < len(self.tokens) and self.tokens[self.index] == '|':
+            self.index += 1
+            options.append(self.sequence())
+        # Skip the closing ')'; an unclosed group runs to the end of the input.
+        self.index += 1
+
+        key = ('group',) + tuple(tuple(map(id, option)) for option in options)
+        return self.node(key, {'type': 'group', 'options': options})
+
+    def quantify(self, element, token):
+        """Wrap element in the quantifier named by token."""
+        if token == '?':
+            return self.node(('optional', id(element)), {'type': 'optional', 'element': element})
+        if token == '*':
+            return self.node(('star', id(element)), {'type': 'star', 'element': element})
+        if token[1:] == "(+)":
+            return self.node(('one_or_more', id(element)), {'type': 'one_or_more', 'element': element})
+        power = int(token[2:-1])
+        return self.node(('power', id(element), power),
+                         {'type': 'power', 'element': element, 'power': power})
+
+
+class RegexTrace:
+    """Per-call record of processing steps, stage timings and stage output counts."""
+
+    def __init__(self):
+        self.steps = []
+        self.timings = {}
+        self.counts = {}
+
+    def step(self, message):
+        """Record one processing step."""
+        self.steps.append(message)
+
+    def record(self, stage, seconds, count):
+        """Add the time spent in a stage and the number of items it produced."""
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+        self.counts[stage] = self.counts.get(stage, 0) + count
 
-                return results
 
-            elif element['type'] == 'one_or_more':
-                inner_combinations = expand_element(element['element'])
-                results = []
-
-                for repeat_count in range(1, self.max_repeat + 1):
-                    for inner_combo in inner_combinations:
-                        repeated = inner_combo * repeat_count
-                        results.append(repeated)
+class RegexCombinationGenerator:
+    def __init__(self, max_repeat=5):
+        self.max_repeat = max_repeat
 
-                return results
+    # Every stage takes an optional trace (a RegexTrace or any object with
+    # step and record methods). Without one, no messages are formatted and
+    # nothing is timed; the trace lives only as long as the call using it.
 
-            elif element['type'] == 'power':
-                inner_combinations = expand_element(element['element'])
-                results = []
-                power = element['power']
+    def tokenize(self, regex_str, trace=None):
+        """Split the regex into tokens for parsing."""
+        if trace is None:
+            return TOKEN_PATTERN.findall(regex_str)
+
+        trace.step(f"Tokenizing regex: {regex_str}")
+        start = time.perf_counter()
+        tokens = TOKEN_PATTERN.findall(regex_str)
+        trace.record('tokenize', time.perf_counter() - start, len(tokens))
+        trace.step(f"Tokens: {tokens}")
+        return tokens
 
-                if power == 0:
-                    return [[]]
+    def parse(self, tokens, trace=None):
+        """Parse tokens into a structured representation."""
+        if trace is None:
+            return RegexParser(tokens).parse()
+
+        trace.step("Starting to parse tokens")
+        start = time.perf_counter()
+        result = RegexParser(tokens).parse()
+        trace.record('parse', time.perf_counter() - start, len(result))
+        trace.step(f"Parsed structure: {result}")
+        return result
 
-                for inner_combo in inner_combinations:
-                    repeated = inner_combo * power
-                    results.append(repeated)
+    def generate_combinations(self, parsed_regex, max_results=10, trace=None):
+        """Generate combinations based on the parsed regex."""
+        if trace is not None:
+            trace.step("Starting to generate combinations")
+            start = time.perf_counter()
 
-                return results
+        memo = {}
+        total = self.count_combinations(parsed_regex, memo)
 
-        all_element_combinations = []
-        for element in parsed_regex:
-            element_combinations = expand_element(element)
-            all_element_combinations.append(element_combinations)
-
-        result_combinations = [[]]
-        for element_combinations in all_element_combinations:
-            new_combinations = []
-            for combo in result_combinations:
-                for element_combo in element_combinations:
-                    new_combinations.append(combo + element_combo)
-            result_combinations = new_combinations
-
-        result_strings = [''.join(combo) for combo in result_combinations]
-
-        if len(result_strings) > max_results:
-            self.processing_steps.append(
-                f"Limiting results: {len(result_strings)} combinations found, sampling {max_results}")
-            result_strings = random.sample(result_strings, max_results)
+        if total > max_results:
+            if trace is not None:
+                trace.step(f"Limiting results: {total} combinations found, sampling {max_results}")
+            result_strings = self.sample_combinations(parsed_regex, max_results)
         else:
-            self.processing_steps.append(f"Generated {len(result_strings)} combinations")
+            result_strings = list(self.iter_combinations(parsed_regex, memo))
+            if trace is not None:
+                trace.step(f"Generated {len(result_strings)} combinations")
 
+        if trace is not None:
+            trace.record('generate', time.perf_counter() - start, len(result_strings))
         return result_strings
 
-    def generate_from_regex(self, regex_str, max_results=10):
-        """Generate valid combinations from a regex string."""
-        self.processing_steps = []
-        self.processing_steps.append(f"Processing regex: {regex_str}")
+    def expansions(self, element, memo):
+        """All expansions of one element, computed on first use and shared through memo."""
+        # The parser hands out one object per distinct subtree, so keying on
+        # identity expands each repeated sub-pattern once per call.
+        key = ('expansions', id(element))
+        if key not in memo:
+            memo[key] = tuple(self.iter_element(element, memo))
+        return memo[key]
+
+    def iter_element(self, element, memo=None):
+        """Lazily yield the expansions of one element, in expand_element order."""
+        if memo is None:
+            memo = {}
+
+        if element['type'] == 'char':
+            yield element['value']
+
+        elif element['type'] == 'group':
+            for option in element['options']:
+                for combo in product(*(self.expansions(node, memo) for node in option)):
+                    yield ''.join(combo)
+
+        elif element['type'] == 'optional':
+            yield ''
+            yield from self.expansions(element['element'], memo)
+
+        elif element['type'] in ('star', 'one_or_more'):
+            if element['type'] == 'star':
+                yield ''
+            inner = self.expansions(element['element'], memo)
+            for repeat_count in range(1, self.max_repeat + 1):
+                for expansion in inner:
+                    yield expansion * repeat_count
+
+        elif element['type'] == 'power':
+            # ^(0) is the empty string whether or not the element it wraps
+            # has any expansions, as element_count and element_at assume.
+            if element['power'] == 0:
+                yield ''
+                return
+            for expansion in self.expansions(element['element'], memo):
+                yield expansion * element['power']
+
+    def iter_combinations(self, parsed_regex, memo=None):
+        """Lazily yield every combination, in the order generate_combinations lists them."""
+        if memo is None:
+            memo = {}
+        for combo in product(*(self.expansions(element, memo) for element in parsed_regex)):
+            yield ''.join(combo)
+
+    def element_count(self, element, memo=None):
+        """Number of expansions of one element, without expanding it."""
+        if memo is None:
+            memo = {}
+        key = ('count', id(element))
+        if key in memo:
+            return memo[key]
+
+        # Quantifiers wrap a single element, so a node is a chain of wrappers
+        # around a char or group; walking the chain iteratively keeps deeply
+        # stacked quantifiers linear and clear of the recursion limit.
+        wrappers = []
+        while element['type'] not in ('char', 'group'):
+            wrappers.append(element)
+            element = element['element']
+
+        if element['type'] == 'char':
+            count = 1
+        else:
+            count = sum(self.count_combinations(option, memo) for option in element['options'])
+
+        for wrapper in reversed(wrappers):
+            if wrapper['type'] == 'optional':
+                count = 1 + count
+            elif wrapper['type'] == 'star':
+                count = 1 + self.max_repeat * count
+            elif wrapper['type'] == 'one_or_more':
+                count = self.max_repeat * count
+            elif wrapper['power'] == 0:
+                count = 1
+
+        memo[key] = count
+        return count
+
+    def count_combinations(self, parsed_regex, memo=None):
+        if memo is None:
+            memo = {}
+        total = 1
+        for element in parsed_regex:
+            total *= self.element_count(element, memo)
+        return total
+
+    def count(self, regex_str):
+        """Number of combinations a regex yields, computed from its structure."""
+        return self.count_combinations(parse_regex(regex_str)[1])
+
+    def element_at(self, element, index, memo=None):
+        """The index-th expansion of one element, in iter_element order."""
+        if memo is None:
+            memo = {}
+
+        if element['type'] == 'char':
+            return element['value']
+
+        if element['type'] == 'group':
+            for option in element['options']:
+                option_count = self.count_combinations(option, memo)
+                if index < option_count:
+                    return self.combination_at(option, index, memo=memo)
+                index -= option_count
+            raise IndexError("combination index out of range")
+
+        if element['type'] == 'optional':
+            return '' if index == 0 else self.element_at(element['element'], index - 1, memo)
+
+        if element['type'] in ('star', 'one_or_more'):
+            if element['type'] == 'star':
+                if index == 0:
+                    return ''
+                index -= 1
+            repeats, inner_index = divmod(index, self.element_count(element['element'], memo))
+            return self.element_at(element['element'], inner_index, memo) * (repeats + 1)
+
+        if element['type'] == 'power':
+            if element['power'] == 0:
+                return ''
+            return self.element_at(element['element'], index, memo) * element['power']
+
+    def combination_at(self, parsed_regex, index, counts=None, memo=None):
+        """Decode a combination index as a mixed-radix number, last element fastest."""
+        if memo is None:
+            memo = {}
+        if counts is None:
+            counts = [self.element_count(element, memo) for element in parsed_regex]
+
+        parts = []
+        for element, count in zip(reversed(parsed_regex), reversed(counts)):
+            index, digit = divmod(index, count)
+            parts.append(self.element_at(element, digit, memo))
+        return ''.join(reversed(parts))
+
+    def sample_combinations(self, parsed_regex, k, rng=random):
+        """k distinct combinations chosen uniformly at random, in O(k) decodes."""
+        memo = {}
+        counts = [self.element_count(element, memo) for element in parsed_regex]
+        total = 1
+        for count in counts:
+            total *= count
+
+        if 2 * k >= total:
+            indices = rng.sample(range(total), min(k, total))
+        else:
+            chosen = set()
+            indices = []
+            while len(indices) < k:
+                index = rng.randrange(total)
+                if index not in chosen:
+                    chosen.add(index)
+                    indices.append(index)
+
+        return [self.combination_at(parsed_regex, index, counts, memo) for index in indices]
+
+    def iter_range(self, parsed_regex, start=0, stop=None, memo=None):
+        """Yield combinations start..stop-1 in iter_combinations order, skipping earlier ones."""
+        if memo is None:
+            memo = {}
+        counts = [self.element_count(element, memo) for element in parsed_regex]
+        total = 1
+        for count in counts:
+            total *= count
+        stop = total if stop is None else min(stop, total)
+        if start >= stop:
+            return
+
+        # Trailing elements are enumerated by product in blocks of at most
+        # BLOCK_LIMIT combinations; the prefix before them is decoded once
+        # per block, so large elements are never expanded.
+        split = len(parsed_regex)
+        block = 1
+        while split and block * counts[split - 1] <= BLOCK_LIMIT:
+            split -= 1
+            block *= counts[split]
+        prefix, prefix_counts = parsed_regex[:split], counts[:split]
+        tables = [self.expansions(element, memo) for element in parsed_regex[split:]]
+
+        for outer in range(start // block, (stop - 1) // block + 1):
+            head = self.combination_at(prefix, outer, prefix_counts, memo)
+            low = max(start - outer * block, 0)
+            high = min(stop - outer * block, block)
+            for combo in islice(product((head,), *tables), low, high):
+                yield ''.join(combo)
+
+    def iter_blocks(self, regex_str, processes=None, chunk_size=1 << 16, start=0, stop=None,
+                    separator='\n'):
+        """Yield index ranges of combinations, each joined by separator, in order."""
+        total = self.count(regex_str)
+        stop = total if stop is None else min(stop, total)
+        window = 2 * (processes or os.cpu_count() or 1)
+
+        # Workers get only the regex and an index range, and results are
+        # consumed in submission order, so the output matches iter_range
+        # exactly. At most window ranges are in flight at a time.
+        with ProcessPoolExecutor(processes) as pool:
+            pending = deque()
+            for low in range(start, stop, chunk_size):
+                high = min(low + chunk_size, stop)
+                pending.append(pool.submit(combination_block, regex_str, self.max_repeat,
+                                           low, high, separator))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def iter_combinations_parallel(self, regex_str, processes=None, chunk_size=1 << 16,
+                                   start=0, stop=None):
+        """Yield combinations start..stop-1 in order, decoding index ranges on a process pool."""
+        # One string per range pickles far faster than a list of short ones.
+        separator = block_separator(regex_str)
+        for block in self.iter_blocks(regex_str, processes, chunk_size, start, stop, separator):
+            yield from block.split(separator)
+
+    def write_combinations(self, regex_str, path, processes=None, chunk_size=1 << 16,
+                           start=0, stop=None):
+        """Write combinations start..stop-1 to path, one per line, and return how many."""
+        total = self.count(regex_str)
+        stop = total if stop is None else min(stop, total)
+
+        with open(path, 'w') as file:
+            for block in self.iter_blocks(regex_str, processes, chunk_size, start, stop):
+                file.write(block)
+                file.write('\n')
+        return max(stop - start, 0)
+
+    def build_nfa(self, parsed_regex):
+        """Build an epsilon-NFA accepting exactly the strings the generator can produce."""
+        moves = [{}]
+        epsilon = [[]]
+        memo = {}
+
+        def new_state():
+            moves.append({})
+            epsilon.append([])
+            return len(moves) - 1
+
+        def add_string(start, end, text):
+            current = start
+            for char in text:
+                following = new_state()
+                moves[current].setdefault(char, []).append(following)
+                current = following
+            epsilon[current].append(end)
+
+        def add_sequence(sequence, start, end):
+            current = start
+            for element in sequence:
+                following = new_state()
+                add_element(element, current, following)
+                current = following
+            epsilon[current].append(end)
+
+        def add_element(element, start, end):
+            if element['type'] == 'char':
+                add_string(start, end, element['value'])
 
-        tokens = self.tokenize(regex_str)
-        parsed = self.parse(tokens)
-        combinations = self.generate_combinations(parsed, max_results)
+            elif element['type'] == 'group':
+                for option in element['options']:
+                    add_sequence(option, start, end)
 
-        return combinations
+            elif element['type'] == 'optional':
+                epsilon[start].append(end)
+                add_element(element['element'], start, end)
 
-    def get_processing_steps(self):
-        """Return the sequence of processing steps."""
-        return self.processing_steps
+            else:
+                # Repetition copies one chosen expansion of the inner element,
+                # so each distinct expansion gets its own chain of copies with
+                # an exit after every allowed repeat count.
+                if element['type'] == 'star':
+                    epsilon[start].append(end)
+                if element['type'] == 'power':
+                    low = high = element['power']
+                else:
+                    low, high = 1, self.max_repeat
+                if high == 0:
+                    # ^(0) matches only the empty string; star already has its
+                    # empty exit, and one_or_more with max_repeat 0 matches nothing.
+                    if element['type'] == 'power':
+                        epsilon[start].append(end)
+                    return
+
+                for inner in dict.fromkeys(self.expansions(element['element'], memo)):
+                    current = start
+                    for repeat_count in range(1, high + 1):
+                        following = new_state()
+                        add_string(current, following, inner)
+                        if repeat_count >= low:
+                            epsilon[following].append(end)
+                        current = following
+
+        accept = new_state()
+        add_sequence(parsed_regex, 0, accept)
+        return moves, epsilon, 0, accept
+
+    def compile(self, regex_str):
+        """Compile a regex to a DFA matcher, cached by regex and max_repeat."""
+        return compile_regex(regex_str, self.max_repeat)
+
+    def matches(self, regex_str, text):
+        """Whether text is one of the combinations the regex can generate."""
+        return self.compile(regex_str).matches(text)
+
+    def generate_from_regex(self, regex_str, max_results=10, trace=None):
+        """Generate valid combinations from a regex string."""
+        if trace is None:
+            # Parsing does not depend on max_repeat, so every generator
+            # shares the cached structure.
+            parsed = parse_regex(regex_str)[1]
+        else:
+            # A traced call tokenizes and parses afresh, so the recorded
+            # timings measure the stages rather than a cache lookup.
+            trace.step(f"Processing regex: {regex_str}")
+            parsed = self.parse(self.tokenize(regex_str, trace), trace)
+
+        return self.generate_combinations(parsed, max_results, trace)
+
+
+class CompiledRegex:
+    """Table-driven DFA for one regex, matching in time linear in the input."""
+
+    def __init__(self, table, symbol_codes, accepting, start, dead, unknown_symbol):
+        self.table = table
+        self.symbol_codes = symbol_codes
+        self.accepting = accepting
+        self.start = start
+        self.dead = dead
+        self.unknown_symbol = unknown_symbol
+
+    @classmethod
+    def from_nfa(cls, moves, epsilon, start, accept):
+        """Subset-construct a DFA and lay it out as a flat table of row offsets."""
+
+        def closure(states):
+            stack = list(states)
+            seen = set(states)
+            while stack:
+                for following in epsilon[stack.pop()]:
+                    if following not in seen:
+                        seen.add(following)
+                        stack.append(following)
+            return frozenset(seen)
+
+        symbols = sorted({char for state_moves in moves for char in state_moves})
+        symbol_codes = {symbol: i for i, symbol in enumerate(symbols)}
+
+        start_set = closure([start])
+        state_codes = {start_set: 0}
+        worklist = [start_set]
+        dfa_moves = []
+        while worklist:
+            current = worklist.pop()
+            targets = {}
+            for state in current:
+                for char, following in moves[state].items():
+                    targets.setdefault(char, set()).update(following)
+
+            row = {}
+            for char, states in targets.items():
+                target = closure(states)
+                if target not in state_codes:
+                    state_codes[target] = len(state_codes)
+                    worklist.append(target)
+                row[symbol_codes[char]] = state_codes[target]
+            dfa_moves.append((state_codes[current], row))
+
+        # Same layout as lab1's CompiledAutomaton: a trailing dead row and a
+        # trailing column for characters outside the pattern's alphabet.
+        width = len(symbols) + 1
+        dead = len(state_codes) * width
+        table = [dead] * (dead + width)
+        for state, row in dfa_moves:
+            for code, target in row.items():
+                table[state * width + code] = target * width
+
+        accepting = [False] * (dead + width)
+        for states, state in state_codes.items():
+            if accept in states:
+                accepting[state * width] = True
+
+        return cls(table, symbol_codes, accepting, 0, dead, width - 1)
+
+    def matches(self, text):
+        """Whether the DFA accepts text."""
+        table = self.table
+        code = self.symbol_codes.get
+        unknown = self.unknown_symbol
+        dead = self.dead
+
+        current = self.start
+        for char in text:
+            current = table[current + code(char, unknown)]
+            if current == dead:
+                return False
+        return self.accepting[current]
+
+
+def combination_block(regex_str, max_repeat, start, stop, separator):
+    """Worker for iter_blocks: the combinations with indices start..stop-1, joined."""
+    generator = RegexCombinationGenerator(max_repeat)
+    return separator.join(generator.iter_range(parse_regex(regex_str)[1], start, stop))
+
+
+def block_separator(regex_str):
+    """A character that cannot occur in any combination of regex_str."""
+    # Combinations are built only from characters of the regex itself.
+    if '\n' not in regex_str:
+        return '\n'
+    return next(chr(code) for code in range(0x110000) if chr(code) not in regex_str)
+
+
+@lru_cache(maxsize=256)
+def parse_regex(regex_str):
+    """Tokens and parsed structure of a regex, cached; callers must not mutate them."""
+    generator = RegexCombinationGenerator()
+    tokens = generator.tokenize(regex_str)
+    return tuple(tokens), generator.parse(tokens)
+
+
+@lru_cache(maxsize=128)
+def compile_regex(regex_str, max_repeat=5):
+    """Compile a regex string to a CompiledRegex; repeated patterns hit the cache."""
+    generator = RegexCombinationGenerator(max_repeat)
+    return CompiledRegex.from_nfa(*generator.build_nfa(parse_regex(regex_str)[1]))
 
 
 def main():
@@ -217,14 +593,19 @@ def main():
     for i, regex in enumerate(regex_examples, 1):
         print(f"\nExample {i}: {regex}")
 
-        combinations = generator.generate_from_regex(regex, max_results=10)
+        trace = RegexTrace()
+        combinations = generator.generate_from_regex(regex, max_results=10, trace=trace)
         print("Generated combinations:")
         print("{" + ", ".join(combinations) + ", ...}")
 
         print("\nProcessing steps:")
-        for step in generator.get_processing_steps():
+        for step in trace.steps:
             print(f"- {step}")
 
+        print("\nStage timings:")
+        for stage, seconds in trace.timings.items():
+            print(f"- {stage}: {trace.counts[stage]} items in {seconds * 1000:.3f} ms")
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file